@@ -0,0 +1,108 @@
+import logging
+import threading
+import time
+
+import telegram
+
+HISTORY_SIZE = 10
+LONG_POLL_TIMEOUT = 30
+COMMANDS_LEASE = 'commands'
+
+HELP_TEXT = (
+    '/status - текущий статус ваших работ\n'
+    '/history - последние изменения статусов'
+)
+NO_DATA_TEXT = 'Статусы ваших работ пока неизвестны.'
+
+
+class CommandListener:
+    """Ответы на команды бота из общего журнала статусов.
+
+    Слушатель получает обновления через long polling ``getUpdates`` в
+    отдельном потоке и никогда не обращается к API Практикума. Telegram
+    не позволяет нескольким процессам одновременно читать обновления
+    одного бота, поэтому слушает только реплика, арендовавшая
+    ``COMMANDS_LEASE``. Ответы строятся по журналу ``history``, общему
+    для всех реплик, поэтому не зависят от того, какая реплика
+    опрашивает тенанта. ``render`` превращает запись журнала в текст.
+    """
+
+    def __init__(self, bot: telegram.Bot, history, leases,
+                 render) -> None:
+        self.bot = bot
+        self.history = history
+        self.leases = leases
+        self.render = render
+        self.offset = None
+        self.handlers = {
+            '/status': self.handle_status,
+            '/history': self.handle_history,
+            '/start': self.handle_help,
+            '/help': self.handle_help,
+        }
+
+    def start(self) -> threading.Thread:
+        """Запуск слушателя в фоновом потоке."""
+        thread = threading.Thread(
+            target=self.run, name='command-listener', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def run(self) -> None:
+        """Бесконечный цикл получения и обработки команд."""
+        while True:
+            try:
+                if not self.leases.acquire(COMMANDS_LEASE):
+                    time.sleep(LONG_POLL_TIMEOUT)
+                    continue
+                self.poll()
+            except Exception as error:
+                logging.error(
+                    f'Ошибка при получении команд:\n {error}', exc_info=True
+                )
+                time.sleep(LONG_POLL_TIMEOUT)
+
+    def poll(self) -> None:
+        """Один запрос ``getUpdates`` и ответы на полученные команды."""
+        updates = self.bot.get_updates(
+            offset=self.offset, timeout=LONG_POLL_TIMEOUT
+        )
+        for update in updates:
+            self.offset = update.update_id + 1
+            if update.message and update.message.text:
+                self.dispatch(
+                    str(update.effective_chat.id), update.message.text
+                )
+
+    def dispatch(self, tenant: str, text: str) -> None:
+        """Выбор обработчика по тексту команды."""
+        words = text.split()
+        if not words:
+            return
+        command = words[0].split('@')[0].lower()
+        handler = self.handlers.get(command)
+        if handler is None:
+            return
+        try:
+            self.bot.send_message(chat_id=tenant, text=handler(tenant))
+            logging.info(f'Ответ на команду {command} отправлен.')
+        except telegram.error.TelegramError as error:
+            logging.error(f'Ошибка при ответе на команду:\n {error}')
+
+    def handle_status(self, tenant: str) -> str:
+        """Ответ на /status."""
+        lines = [self.render(hw) for hw in self.history.current(tenant)]
+        return '\n'.join(lines) or NO_DATA_TEXT
+
+    def handle_history(self, tenant: str) -> str:
+        """Ответ на /history."""
+        lines = [
+            f'{hw["date_updated"]}: {self.render(hw)}'
+            for hw in self.history.latest(tenant, HISTORY_SIZE)
+        ]
+        return '\n'.join(lines) or NO_DATA_TEXT
+
+    def handle_help(self, tenant: str) -> str:
+        """Ответ на /start и /help."""
+        return HELP_TEXT
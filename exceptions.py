@@ -1,5 +1,6 @@
-class StatusKeyError(Exception):
-    pass
+class HomeworkDataError(KeyError):
+    def __str__(self):
+        return str(self.args[0]) if self.args else ''
 
 
 class ResponseError(Exception):
@@ -8,3 +9,7 @@ class ResponseError(Exception):
 
 class ResponseDataError(Exception):
     pass
+
+
+class RosterError(Exception):
+    pass
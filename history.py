@@ -0,0 +1,378 @@
+import argparse
+import math
+import os
+import random
+import sqlite3
+import sys
+import time
+from calendar import timegm
+from collections import defaultdict
+from functools import lru_cache
+
+from tracing import parse_date
+
+HISTORY_DB = os.getenv('HISTORY_DB', 'homework_bot.sqlite3')
+
+REVIEWING = 'reviewing'
+VERDICTS = ('approved', 'rejected')
+PERIODS = {
+    'day': '%Y-%m-%d',
+    'week': '%Y-W%W',
+    'month': '%Y-%m',
+}
+
+BUCKET_BASE = 1.05
+DAY = 24 * 3600
+ALL_TENANTS = ''
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS status_history (
+    id INTEGER PRIMARY KEY,
+    tenant TEXT NOT NULL,
+    homework TEXT NOT NULL,
+    status TEXT NOT NULL,
+    ts INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS status_history_homework
+    ON status_history (tenant, homework, id);
+CREATE INDEX IF NOT EXISTS status_history_tenant
+    ON status_history (tenant);
+CREATE TABLE IF NOT EXISTS daily_turnaround (
+    day INTEGER NOT NULL,
+    tenant TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    reviews INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    PRIMARY KEY (tenant, day, bucket)
+);
+CREATE TABLE IF NOT EXISTS daily_verdicts (
+    day INTEGER NOT NULL,
+    tenant TEXT NOT NULL,
+    verdicts INTEGER NOT NULL,
+    rejected INTEGER NOT NULL,
+    PRIMARY KEY (tenant, day)
+);
+'''
+
+
+def format_date(ts: int) -> str:
+    """Unix-время в формате ``date_updated`` из ответа API."""
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(ts))
+
+
+def to_bucket(seconds: int) -> int:
+    """Номер логарифмической корзины для длительности."""
+    return math.floor(math.log1p(max(seconds, 0)) / math.log(BUCKET_BASE))
+
+
+def from_bucket(bucket: int) -> int:
+    """Верхняя граница корзины в секундах."""
+    return round(math.expm1((bucket + 1) * math.log(BUCKET_BASE)))
+
+
+@lru_cache(maxsize=4096)
+def period_key(day: int, period: str) -> str:
+    """Название периода, в который попадает день ``day``."""
+    return time.strftime(PERIODS[period], time.gmtime(day * DAY))
+
+
+def histogram_percentile(histogram: dict, total: int, share: float):
+    """Перцентиль по гистограмме ``{корзина: количество}``."""
+    rank = max(math.ceil(share * total), 1)
+    seen = 0
+    for bucket in sorted(histogram):
+        seen += histogram[bucket]
+        if seen >= rank:
+            return from_bucket(bucket)
+    return None
+
+
+class HistoryStore:
+    """Журнал переходов статусов работ в SQLite.
+
+    Журнал только дополняется и хранит лишь переходы: повтор того же
+    статуса работы не записывается. Вместе с переходом в той же
+    транзакции обновляются дневные сводки: гистограмма времени ревью в
+    логарифмических корзинах (погрешность перцентилей не больше 5%) и
+    счётчики вердиктов, отдельно по тенанту и по всем тенантам сразу.
+    Отчёты читают только сводки, поэтому их время не зависит от числа
+    строк журнала.
+    """
+
+    def __init__(self, path: str = HISTORY_DB) -> None:
+        self.path = path
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def append(self, tenant: str, homework: dict) -> bool:
+        """Запись перехода статуса; ``False`` для повторного статуса."""
+        return bool(self.append_many([(tenant, homework)]))
+
+    def append_many(self, transitions) -> int:
+        """Запись пар ``(тенант, работа)`` одной транзакцией.
+
+        Возвращает число записанных переходов.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                return sum(
+                    self._append(conn, tenant, homework)
+                    for tenant, homework in transitions
+                )
+        finally:
+            conn.close()
+
+    def _append(self, conn: sqlite3.Connection, tenant: str,
+                homework: dict) -> bool:
+        name = homework['homework_name']
+        status = homework['status']
+        ts = parse_date(homework.get('date_updated'))
+        last = conn.execute(
+            'SELECT status, ts FROM status_history '
+            'WHERE tenant = ? AND homework = ? '
+            'ORDER BY id DESC LIMIT 1',
+            (tenant, name),
+        ).fetchone()
+        if last and last[0] == status:
+            return False
+        conn.execute(
+            'INSERT INTO status_history '
+            '(tenant, homework, status, ts) VALUES (?, ?, ?, ?)',
+            (tenant, name, status, ts),
+        )
+        if status in VERDICTS:
+            self._count_verdict(conn, tenant, status, ts)
+        if last and last[0] == REVIEWING and status in VERDICTS:
+            self._count_review(conn, tenant, ts, ts - last[1])
+        return True
+
+    def latest(self, tenant: str, limit: int) -> list:
+        """Последние переходы тенанта, от старых к новым."""
+        return self._homeworks(
+            'SELECT homework, status, ts FROM status_history '
+            'WHERE tenant = ? ORDER BY id DESC LIMIT ?',
+            (tenant, limit),
+        )[::-1]
+
+    def current(self, tenant: str) -> list:
+        """Последний статус каждой работы тенанта."""
+        return self._homeworks(
+            'SELECT homework, status, ts FROM status_history '
+            'WHERE id IN ('
+            'SELECT MAX(id) FROM status_history '
+            'WHERE tenant = ? GROUP BY homework'
+            ') ORDER BY id',
+            (tenant,),
+        )
+
+    def _homeworks(self, sql: str, params: tuple) -> list:
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [
+            {
+                'homework_name': homework,
+                'status': status,
+                'date_updated': format_date(ts),
+            }
+            for homework, status, ts in rows
+        ]
+
+    def _count_verdict(self, conn: sqlite3.Connection, tenant: str,
+                       status: str, ts: int) -> None:
+        conn.executemany(
+            'INSERT INTO daily_verdicts (day, tenant, verdicts, rejected) '
+            'VALUES (?, ?, 1, ?) '
+            'ON CONFLICT (tenant, day) DO UPDATE SET '
+            'verdicts = verdicts + 1, rejected = rejected + excluded.rejected',
+            [
+                (ts // DAY, key, int(status == 'rejected'))
+                for key in (tenant, ALL_TENANTS)
+            ],
+        )
+
+    def _count_review(self, conn: sqlite3.Connection, tenant: str,
+                      ts: int, duration: int) -> None:
+        conn.executemany(
+            'INSERT INTO daily_turnaround '
+            '(day, tenant, bucket, reviews, total) VALUES (?, ?, ?, 1, ?) '
+            'ON CONFLICT (tenant, day, bucket) DO UPDATE SET '
+            'reviews = reviews + 1, total = total + excluded.total',
+            [
+                (ts // DAY, key, to_bucket(duration), duration)
+                for key in (tenant, ALL_TENANTS)
+            ],
+        )
+
+    def size(self) -> int:
+        """Число записей журнала."""
+        conn = self._connect()
+        try:
+            return conn.execute(
+                'SELECT COALESCE(MAX(id), 0) FROM status_history'
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    def _query(self, sql: str, since: int, tenant: str = None) -> list:
+        conn = self._connect()
+        try:
+            return conn.execute(
+                sql + ' WHERE tenant = ? AND day >= ?',
+                (tenant or ALL_TENANTS, since // DAY),
+            ).fetchall()
+        finally:
+            conn.close()
+
+    def turnaround(self, period: str = 'week', since: int = 0,
+                   tenant: str = None) -> list:
+        """Время ревью (от ``reviewing`` до вердикта) по периодам."""
+        rows = self._query(
+            'SELECT day, bucket, reviews, total '
+            'FROM daily_turnaround',
+            since, tenant,
+        )
+        histograms = defaultdict(lambda: defaultdict(int))
+        totals = defaultdict(int)
+        for day, bucket, reviews, total in rows:
+            key = period_key(day, period)
+            histograms[key][bucket] += reviews
+            totals[key] += total
+        report = []
+        for key in sorted(histograms):
+            reviews = sum(histograms[key].values())
+            report.append({
+                'period': key,
+                'reviews': reviews,
+                'reviewing_total': totals[key],
+                'p50': histogram_percentile(histograms[key], reviews, 0.5),
+                'p95': histogram_percentile(histograms[key], reviews, 0.95),
+            })
+        return report
+
+    def rejections(self, period: str = 'week', since: int = 0,
+                   tenant: str = None) -> list:
+        """Доля отклонённых работ среди вердиктов по периодам."""
+        rows = self._query(
+            'SELECT day, verdicts, rejected FROM daily_verdicts',
+            since, tenant,
+        )
+        verdicts = defaultdict(int)
+        rejected = defaultdict(int)
+        for day, day_verdicts, day_rejected in rows:
+            key = period_key(day, period)
+            verdicts[key] += day_verdicts
+            rejected[key] += day_rejected
+        return [
+            {
+                'period': key,
+                'verdicts': verdicts[key],
+                'rejected': rejected[key],
+                'rate': rejected[key] / verdicts[key],
+            }
+            for key in sorted(verdicts)
+        ]
+
+
+def format_duration(seconds) -> str:
+    """Длительность в часах для отчёта."""
+    if seconds is None:
+        return '-'
+    return f'{seconds / 3600:.1f}ч'
+
+
+def _seed_transitions(rows: int, tenants: int, start: int):
+    rng = random.Random(0)
+    for index in range(rows // 2):
+        reviewed = start + rng.randrange(2 * 365 * DAY)
+        homework = f'hw{index}'
+        tenant = str(index % tenants)
+        yield tenant, {
+            'homework_name': homework,
+            'status': REVIEWING,
+            'date_updated': format_date(reviewed),
+        }
+        yield tenant, {
+            'homework_name': homework,
+            'status': rng.choice(VERDICTS),
+            'date_updated': format_date(
+                reviewed + int(rng.expovariate(1 / DAY))
+            ),
+        }
+
+
+def benchmark(path: str, rows: int, tenants: int = 100) -> None:
+    """Время отчётов по журналу из ``rows`` переходов.
+
+    Журнал ``path`` заполняется, только если он пуст, поэтому повторный
+    запуск измеряет уже готовую базу.
+    """
+    store = HistoryStore(path)
+    if not store.size():
+        started = time.perf_counter()
+        written = store.append_many(_seed_transitions(
+            rows, tenants, timegm((2024, 1, 1, 0, 0, 0))
+        ))
+        print(
+            f'Записано переходов: {written} '
+            f'за {time.perf_counter() - started:.0f} с'
+        )
+    print(f'Записей в журнале: {store.size()}')
+    reports = {
+        'turnaround week': lambda: store.turnaround('week'),
+        'turnaround month, тенант': lambda: store.turnaround('month', 0, '1'),
+        'rejections week': lambda: store.rejections('week'),
+        'rejections day': lambda: store.rejections('day'),
+    }
+    for label, report in reports.items():
+        started = time.perf_counter()
+        report()
+        print(f'{label}:\t{time.perf_counter() - started:.3f} с')
+
+
+def main(argv: list = None) -> None:
+    """Командная строка для запросов к журналу статусов."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument(
+        'report', choices=('turnaround', 'rejections', 'benchmark')
+    )
+    parser.add_argument('--db', default=HISTORY_DB)
+    parser.add_argument('--period', choices=PERIODS, default='week')
+    parser.add_argument('--since', help='дата в формате YYYY-MM-DD')
+    parser.add_argument('--tenant')
+    parser.add_argument(
+        '--rows', type=int, default=2000000,
+        help='число переходов для benchmark в пустой базе --db',
+    )
+    args = parser.parse_args(argv)
+    if args.report == 'benchmark':
+        return benchmark(args.db, args.rows)
+    since = (
+        timegm(time.strptime(args.since, '%Y-%m-%d')) if args.since else 0
+    )
+    store = HistoryStore(args.db)
+    if args.report == 'turnaround':
+        for row in store.turnaround(args.period, since, args.tenant):
+            print(
+                f'{row["period"]}\tревью: {row["reviews"]}\t'
+                f'всего: {format_duration(row["reviewing_total"])}\t'
+                f'p50: {format_duration(row["p50"])}\t'
+                f'p95: {format_duration(row["p95"])}'
+            )
+    else:
+        for row in store.rejections(args.period, since, args.tenant):
+            print(
+                f'{row["period"]}\tвердиктов: {row["verdicts"]}\t'
+                f'отклонено: {row["rejected"]}\t'
+                f'доля: {row["rate"]:.1%}'
+            )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
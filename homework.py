@@ -1,7 +1,11 @@
 import logging
 import os
+import signal
+import socket
+import sqlite3
 import sys
 import time
+from functools import partial
 from http import HTTPStatus
 
 import requests
@@ -9,6 +13,16 @@ import telegram
 from dotenv import load_dotenv
 
 import exceptions
+from commands import CommandListener
+from history import HistoryStore
+from leases import LeaseManager
+from memory_watchdog import MB, MemoryWatchdog
+from notifiers import EmailNotifier, FanOut, TelegramNotifier, WebhookNotifier
+from pipeline import ALERT, STATUS, Notification, Pipeline
+from roster import RosterWatcher, Tenant, diff_roster
+from scheduler import Scheduler
+from tracing import Tracer
+from validators import schema_validator
 
 load_dotenv()
 
@@ -16,8 +30,34 @@ load_dotenv()
 PRACTICUM_TOKEN = os.getenv('PRACTICUM_TOKEN')
 TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN')
 TELEGRAM_CHAT_ID = os.getenv('TELEGRAM_CHAT_ID')
+ROSTER_FILE = os.getenv('ROSTER_FILE')
 
 RETRY_TIME = 600
+LEASE_DB = os.getenv('LEASE_DB', 'homework_bot.sqlite3')
+HISTORY_DB = os.getenv('HISTORY_DB', 'homework_bot.sqlite3')
+LEASE_TTL = 90
+LEASE_RETRY_TIME = 30
+REQUEST_TIMEOUT = 30
+DRAIN_TIMEOUT = 25
+QUEUE_SIZE = int(os.getenv('QUEUE_SIZE', 100))
+SEND_WORKERS = int(os.getenv('SEND_WORKERS', 1))
+ROSTER_CHECK_TIME = 5
+NOTIFY_TIMEOUT = 10
+NOTIFY_RETRIES = 2
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+SMTP_HOST = os.getenv('SMTP_HOST')
+SMTP_PORT = int(os.getenv('SMTP_PORT', 25))
+EMAIL_FROM = os.getenv('EMAIL_FROM', 'homework-bot@localhost')
+EMAIL_TO = os.getenv('EMAIL_TO')
+TRACE_FILE = os.getenv('TRACE_FILE', 'homework_bot.traces.jsonl')
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', 0.1))
+MEMORY_DUMP_DIR = os.getenv('MEMORY_DUMP_DIR', 'memory_dumps')
+MEMORY_LIMIT_MB = int(os.getenv('MEMORY_LIMIT_MB', 400))
+MEMORY_GROWTH_MB = int(os.getenv('MEMORY_GROWTH_MB', 50))
+MEMORY_CHECK_TIME = 60
+MEMORY_TRACE_TIME = 300
+MEMORY_ALWAYS_TRACE = bool(os.getenv('MEMORY_ALWAYS_TRACE'))
+REPLICA_ID = os.getenv('DYNO') or f'{socket.gethostname()}:{os.getpid()}'
 ENDPOINT = 'https://practicum.yandex.ru/api/user_api/homework_statuses/'
 HEADERS = {'Authorization': f'OAuth {PRACTICUM_TOKEN}'}
 
@@ -27,6 +67,11 @@ HOMEWORK_STATUSES = {
     'reviewing': 'Работа взята на проверку ревьюером.',
     'rejected': 'Работа проверена: у ревьюера есть замечания.'
 }
+HOMEWORK_SCHEMA = {
+    'homework_name': (str, None),
+    'status': (str, HOMEWORK_STATUSES),
+}
+validate_homework = schema_validator(HOMEWORK_SCHEMA, 'homework')
 
 logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -35,25 +80,37 @@ logging.basicConfig(
 )
 
 
-def send_message(bot: telegram.Bot, message: str) -> None:
-    """Отправка сообщения в телеграм."""
-    try:
-        bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
-            text=message,
-        )
+def send_message(bot: telegram.Bot, message: str) -> bool:
+    """Отправка сообщения в чат ``TELEGRAM_CHAT_ID``.
+
+    Сообщение уходит через ``TelegramNotifier`` с теми же таймаутом,
+    повторами и метриками, что и уведомления основного цикла.
+    """
+    delivered = TelegramNotifier(
+        bot, timeout=NOTIFY_TIMEOUT, retries=NOTIFY_RETRIES
+    ).deliver(Notification(str(TELEGRAM_CHAT_ID), message, STATUS, None))
+    if delivered:
         logging.info('Удачная отправка сообщения.')
-    except telegram.error.TelegramError as error:
-        message = f'Ошибка при отправке сообщения:\n {error}'
-        logging.error(message, exc_info=True)
+    return delivered
 
 
 def get_api_answer(current_timestamp: int) -> dict:
-    """Запрос и получение данных с сервера."""
+    """Запрос статусов от имени ``PRACTICUM_TOKEN`` из окружения.
+
+    То же, что ``request_statuses`` для единственного тенанта без
+    ростера.
+    """
+    return request_statuses(current_timestamp, HEADERS)
+
+
+def request_statuses(current_timestamp: int, headers: dict) -> dict:
+    """Запрос статусов от имени тенанта с заголовками ``headers``."""
     timestamp = current_timestamp or int(time.time())
     params = {'from_date': timestamp}
     try:
-        response = requests.get(ENDPOINT, headers=HEADERS, params=params)
+        response = requests.get(
+            ENDPOINT, headers=headers, params=params, timeout=REQUEST_TIMEOUT
+        )
     except requests.RequestException as error:
         raise exceptions.ResponseError(
             f'Ошибка при запросе внешнему API:\n {error}'
@@ -79,53 +136,271 @@ def check_response(response: dict) -> list:
     )
 
 
+def render_status(homework: dict) -> str:
+    """Сообщение о статусе уже проверенной домашней работы."""
+    homework_name = homework['homework_name']
+    verdict = HOMEWORK_STATUSES[homework['status']]
+    return f'Изменился статус проверки работы "{homework_name}". {verdict}'
+
+
 def parse_status(homework) -> str:
     """Определение статуса домашней работы."""
-    homework_name = homework['homework_name']
-    homework_status = homework['status']
-    if homework_status in HOMEWORK_STATUSES:
-        verdict = HOMEWORK_STATUSES[homework_status]
-        return f'Изменился статус проверки работы "{homework_name}". {verdict}'
-    raise exceptions.StatusKeyError('Недокументированный статус работы.')
+    error = validate_homework(homework)
+    if error is not None:
+        raise exceptions.HomeworkDataError(error)
+    return render_status(homework)
+
+
+def check_homeworks(homeworks: list) -> tuple:
+    """Отбор корректных работ; об остальных сообщается по отдельности."""
+    valid = []
+    errors = []
+    for index, homework in enumerate(homeworks):
+        error = validate_homework(homework)
+        if error is None:
+            valid.append(homework)
+            continue
+        errors.append((index, error))
+        logging.error(f'Некорректная работа №{index} в ответе API: {error}')
+    return valid, errors
 
 
 def check_tokens() -> bool:
     """Проверка наличия необходимых переменных окружения."""
     if (
-        PRACTICUM_TOKEN
-        and TELEGRAM_TOKEN
-        and TELEGRAM_CHAT_ID
+        TELEGRAM_TOKEN
+        and (ROSTER_FILE or PRACTICUM_TOKEN and TELEGRAM_CHAT_ID)
     ):
         return True
     logging.critical('Отсутствуют обязательные переменные окружения.')
     return False
 
 
+def render_homeworks(tenant: str, homeworks: list, trace) -> list:
+    """Подготовка уведомлений по списку работ из ответа API."""
+    with trace.span('parse_status', items=len(homeworks)):
+        homeworks, errors = check_homeworks(homeworks)
+        notifications = [
+            Notification(tenant, render_status(hw), STATUS, hw, trace)
+            for hw in homeworks
+        ]
+    if errors:
+        notifications.append(Notification(
+            tenant,
+            'Сбой в работе программы:\n '
+            f'Пропущено некорректных работ: {len(errors)}. '
+            f'Первая ошибка: {errors[0][1]}',
+            ALERT,
+            None,
+        ))
+    return notifications
+
+
+def build_notifiers(bot: telegram.Bot, on_done) -> FanOut:
+    """Каналы доставки из переменных окружения; телеграм есть всегда.
+
+    ``on_done`` вызывается после каждой доставки в телеграм - основной
+    канал, по которому учитываются доставленные статусы.
+    """
+    options = {
+        'timeout': NOTIFY_TIMEOUT,
+        'retries': NOTIFY_RETRIES,
+        'maxsize': QUEUE_SIZE,
+    }
+    notifiers = [TelegramNotifier(bot, on_done=on_done, **options)]
+    if WEBHOOK_URL:
+        notifiers.append(WebhookNotifier(WEBHOOK_URL, **options))
+    if SMTP_HOST and EMAIL_TO:
+        notifiers.append(EmailNotifier(
+            SMTP_HOST, SMTP_PORT, EMAIL_FROM, EMAIL_TO, **options
+        ))
+    return FanOut(notifiers)
+
+
+def deliver(fanout: FanOut, leases: LeaseManager,
+            notification: Notification) -> bool:
+    """Отправка уведомления, пока аренда тенанта за репликой."""
+    tenant = notification.tenant
+    if not leases.acquire(tenant):
+        logging.warning(
+            f'Аренда {tenant} перешла к другой реплике, '
+            'уведомление не отправлено.'
+        )
+        return False
+    fanout.send(notification)
+    return True
+
+
+def confirm_delivery(history: HistoryStore, pipeline: Pipeline,
+                     notification: Notification, delivered: bool,
+                     permanent: bool = False) -> None:
+    """Учёт статуса, который телеграм подтвердил как доставленный.
+
+    Статус с постоянной ошибкой доставки пропускается, иначе курсор
+    тенанта не сдвинулся бы и все статусы ответа отправлялись бы снова
+    при каждом опросе.
+    """
+    try:
+        if notification.homework is None:
+            return
+        if delivered:
+            history.append(notification.tenant, notification.homework)
+        elif permanent:
+            logging.error(
+                f'Статус для {notification.tenant} не может быть доставлен '
+                'в телеграм и пропущен.'
+            )
+        else:
+            logging.error(
+                f'Статус для {notification.tenant} не доставлен в телеграм.'
+            )
+    except sqlite3.Error as error:
+        logging.error(f'Ошибка записи истории статусов:\n {error}')
+    finally:
+        pipeline.done(notification, delivered, permanent)
+
+
+def poll_tenant(leases: LeaseManager, pipeline: Pipeline, tenant: Tenant,
+                trace) -> None:
+    """Один цикл опроса API для тенанта, которым владеет реплика.
+
+    Курсор тенанта сдвигается конвейером, только когда все статусы из
+    ответа доставлены.
+    """
+    current_timestamp = (
+        leases.get_cursor(tenant.chat_id)
+        or int(time.time()) - 3600 * 24 * 30
+    )
+    with trace.span('get_api_answer'):
+        response = request_statuses(current_timestamp, tenant.headers)
+    with trace.span('check_response'):
+        homeworks = check_response(response)
+    pipeline.submit(
+        tenant.chat_id, homeworks, trace,
+        response.get('current_date') or int(time.time()),
+    )
+
+
+def run_cycle(leases: LeaseManager, pipeline: Pipeline, scheduler: Scheduler,
+              tracer: Tracer, tenant: Tenant, due: float,
+              sent_msgs: dict) -> None:
+    """Опрос тенанта, если он за репликой, и планирование следующего."""
+    chat_id = tenant.chat_id
+    if not leases.acquire(chat_id):
+        logging.debug(f'Тенант {chat_id} обслуживает другая реплика.')
+        scheduler.schedule(chat_id, LEASE_RETRY_TIME)
+        return
+    if pipeline.busy(chat_id):
+        logging.debug(f'Прошлый ответ API для {chat_id} ещё не доставлен.')
+        scheduler.schedule(chat_id, LEASE_RETRY_TIME)
+        return
+    due_ns = int(due * 1e9)
+    trace = tracer.start_trace('poll_cycle', due_ns, tenant=chat_id)
+    trace.record('schedule_delay', due_ns, time.time_ns())
+    failure = None
+    try:
+        poll_tenant(leases, pipeline, tenant, trace)
+    except Exception as error:
+        failure = error
+        message = f'Сбой в работе программы:\n {error}'
+        logging.error(message, exc_info=True)
+        if message != sent_msgs.get(chat_id):
+            pipeline.alert(chat_id, message)
+            sent_msgs[chat_id] = message
+    else:
+        sent_msgs.pop(chat_id, None)
+    trace.finish(failure)
+    scheduler.schedule(chat_id, RETRY_TIME)
+
+
+def apply_roster(scheduler: Scheduler, leases: LeaseManager,
+                 sent_msgs: dict, diff) -> None:
+    """Применение разницы ростера без перезапуска и повторных запросов.
+
+    Уведомления удалённого тенанта, ещё стоящие в очередях, не
+    отправляются: его аренду реплика больше не захватывает.
+    """
+    for tenant in diff.added:
+        leases.restore(tenant.chat_id)
+    scheduler.apply(diff)
+    for tenant in diff.removed:
+        leases.retire(tenant.chat_id)
+        sent_msgs.pop(tenant.chat_id, None)
+
+
+def watch_roster(scheduler: Scheduler):
+    """Ростер из ``ROSTER_FILE`` или единственный тенант из окружения."""
+    if not ROSTER_FILE:
+        chat_id = str(TELEGRAM_CHAT_ID)
+        return None, diff_roster({}, {chat_id: Tenant(
+            chat_id, PRACTICUM_TOKEN
+        )})
+    watcher = RosterWatcher(ROSTER_FILE)
+
+    def reload(*args):
+        watcher.request_reload()
+        scheduler.wakeup()
+
+    signal.signal(signal.SIGHUP, reload)
+    return watcher, watcher.poll()
+
+
 def main() -> None:
     """Основная логика работы бота."""
     tokens = check_tokens()
     if not tokens:
         return
+    watchdog = MemoryWatchdog(
+        MEMORY_DUMP_DIR, MEMORY_LIMIT_MB * MB, MEMORY_GROWTH_MB * MB,
+        MEMORY_CHECK_TIME, MEMORY_TRACE_TIME,
+        always_trace=MEMORY_ALWAYS_TRACE,
+    )
+    watchdog.start()
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
-    current_timestamp = int(time.time()) - 3600 * 24 * 30
-    sent_msg = ''
-    while True:
-        try:
-            response = get_api_answer(current_timestamp)
-            current_timestamp = response['current_date'] or int(time.time())
-            homeworks = check_response(response)
-            for hw in homeworks:
-                message = parse_status(hw)
-                send_message(bot, message)
-        except Exception as error:
-            message = f'Сбой в работе программы:\n {error}'
-            logging.error(message, exc_info=True)
-            if message != sent_msg:
-                send_message(bot, message)
-                sent_msg = message
-        else:
-            sent_msg = ''
-        time.sleep(RETRY_TIME)
+    leases = LeaseManager(LEASE_DB, REPLICA_ID, LEASE_TTL)
+    leases.start_heartbeat()
+    history = HistoryStore(HISTORY_DB)
+    CommandListener(
+        telegram.Bot(token=TELEGRAM_TOKEN), history, leases, render_status
+    ).start()
+    fanout = build_notifiers(
+        bot, lambda *outcome: confirm_delivery(history, pipeline, *outcome),
+    )
+    pipeline = Pipeline(
+        render_homeworks, partial(deliver, fanout, leases),
+        SEND_WORKERS, QUEUE_SIZE, commit=leases.set_cursor,
+    )
+    fanout.start()
+    pipeline.start()
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    tracer = Tracer(TRACE_FILE, TRACE_SAMPLE_RATE)
+    scheduler = Scheduler()
+    watcher, diff = watch_roster(scheduler)
+    sent_msgs = {}
+    next_stats = time.time()
+    try:
+        while True:
+            leases.touch()
+            if diff:
+                apply_roster(scheduler, leases, sent_msgs, diff)
+            due = scheduler.next_due(ROSTER_CHECK_TIME)
+            if due is not None:
+                run_cycle(
+                    leases, pipeline, scheduler, tracer, *due, sent_msgs
+                )
+            if time.time() >= next_stats:
+                logging.info(f'Состояние очередей: {pipeline.stats()}')
+                logging.info(f'Каналы доставки: {fanout.stats()}')
+                logging.info(f'Память: {watchdog.stats()}')
+                next_stats = time.time() + RETRY_TIME
+            diff = watcher.poll() if watcher else None
+    finally:
+        if not pipeline.drain(DRAIN_TIMEOUT):
+            logging.warning(
+                'Не все статусы доставлены до остановки, '
+                'они будут запрошены повторно.'
+            )
+        leases.release_all()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,179 @@
+import logging
+import sqlite3
+import threading
+import time
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS leases (
+    tenant TEXT PRIMARY KEY,
+    holder TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    cursor INTEGER
+)
+'''
+
+
+class LeaseManager:
+    """Аренда тенантов между репликами через общий файл SQLite.
+
+    Тенантом владеет ровно одна живая реплика. Владелец продлевает
+    аренду фоновым потоком; если реплика умирает, аренда истекает
+    через ``ttl`` секунд и её забирает другая реплика вместе с
+    сохранённой отметкой времени ``cursor``. Тенанты, убранные из
+    ростера (``retire``), реплика не захватывает и не продлевает, пока
+    их не вернут (``restore``).
+
+    Фоновый поток продлевает аренды, только пока основной цикл реплики
+    отмечает ход работы (``touch``) хотя бы раз за ``ttl`` секунд:
+    зависшая реплика теряет тенантов так же, как упавшая.
+    """
+
+    def __init__(self, path: str, holder: str, ttl: int) -> None:
+        self.path = path
+        self.holder = holder
+        self.ttl = ttl
+        self.held = set()
+        self.retired = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._progress = time.monotonic()
+        with self._connect() as conn:
+            conn.execute(SCHEMA)
+
+    def _connect(self) -> '_Transaction':
+        conn = sqlite3.connect(self.path, timeout=self.ttl)
+        conn.isolation_level = None
+        return _Transaction(conn)
+
+    def acquire(self, tenant: str) -> bool:
+        """Захват или продление аренды тенанта."""
+        with self._lock:
+            if tenant in self.retired:
+                return False
+            return self._acquire(tenant)
+
+    def _acquire(self, tenant: str) -> bool:
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT INTO leases (tenant, holder, expires_at) '
+                'VALUES (?, ?, ?) '
+                'ON CONFLICT (tenant) DO UPDATE SET '
+                'holder = excluded.holder, expires_at = excluded.expires_at '
+                'WHERE leases.holder = excluded.holder '
+                'OR leases.expires_at < ?',
+                (tenant, self.holder, now + self.ttl, now),
+            )
+            row = conn.execute(
+                'SELECT holder FROM leases WHERE tenant = ?', (tenant,)
+            ).fetchone()
+        acquired = row[0] == self.holder
+        if acquired and tenant not in self.held:
+            logging.info(f'Реплика {self.holder} получила {tenant}.')
+            self.held.add(tenant)
+        elif not acquired and tenant in self.held:
+            logging.warning(f'Реплика {self.holder} потеряла {tenant}.')
+            self.held.discard(tenant)
+        return acquired
+
+    def release(self, tenant: str) -> None:
+        """Досрочное освобождение аренды для быстрого переключения."""
+        with self._lock:
+            self._release(tenant)
+
+    def _release(self, tenant: str) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                'UPDATE leases SET expires_at = 0 '
+                'WHERE tenant = ? AND holder = ?',
+                (tenant, self.holder),
+            )
+        self.held.discard(tenant)
+
+    def retire(self, tenant: str) -> None:
+        """Освобождение аренды тенанта, убранного из ростера, навсегда."""
+        with self._lock:
+            self.retired.add(tenant)
+            self._release(tenant)
+
+    def restore(self, tenant: str) -> None:
+        """Возврат тенанта, снова добавленного в ростер."""
+        with self._lock:
+            self.retired.discard(tenant)
+
+    def release_all(self) -> None:
+        """Освобождение всех аренд реплики."""
+        self._stop.set()
+        with self._lock:
+            tenants = list(self.held)
+        for tenant in tenants:
+            self.release(tenant)
+
+    def get_cursor(self, tenant: str):
+        """Отметка времени, до которой тенант уже обработан."""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT cursor FROM leases WHERE tenant = ?', (tenant,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_cursor(self, tenant: str, cursor: int) -> bool:
+        """Сохранение отметки времени, только пока аренда за нами."""
+        with self._connect() as conn:
+            updated = conn.execute(
+                'UPDATE leases SET cursor = ? '
+                'WHERE tenant = ? AND holder = ? AND expires_at >= ?',
+                (cursor, tenant, self.holder, time.time()),
+            ).rowcount
+        return bool(updated)
+
+    def start_heartbeat(self) -> threading.Thread:
+        """Фоновое продление аренд каждую треть ``ttl``."""
+        thread = threading.Thread(
+            target=self._heartbeat, name='lease-heartbeat', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def touch(self) -> None:
+        """Отметка хода основного цикла реплики."""
+        self._progress = time.monotonic()
+
+    def renew(self) -> bool:
+        """Продление всех аренд реплики, если основной цикл не завис."""
+        stalled = time.monotonic() - self._progress
+        if stalled > self.ttl:
+            logging.error(
+                f'Основной цикл реплики {self.holder} не отвечает '
+                f'{stalled:.0f} с, аренды не продлеваются.'
+            )
+            return False
+        with self._lock:
+            tenants = list(self.held)
+        for tenant in tenants:
+            try:
+                self.acquire(tenant)
+            except sqlite3.Error as error:
+                logging.error(f'Ошибка продления аренды:\n {error}')
+        return True
+
+    def _heartbeat(self) -> None:
+        while not self._stop.wait(self.ttl / 3):
+            self.renew()
+
+
+class _Transaction:
+    """Соединение, выполняющее блок в транзакции BEGIN IMMEDIATE."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.conn.close()
@@ -0,0 +1,174 @@
+import logging
+import os
+import resource
+import threading
+import time
+import tracemalloc
+
+MB = 1024 * 1024
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>')
+
+
+def current_rss() -> int:
+    """Текущий RSS процесса в байтах.
+
+    Без ``/proc`` возвращается пиковый RSS (``ru_maxrss``): рост по нему
+    заметен, но спад - нет.
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class MemoryWatchdog:
+    """Слежение за памятью долгоживущего процесса.
+
+    Раз в ``interval`` секунд сравнивает RSS и объём памяти, учтённый
+    tracemalloc, с уровнем прошлого отчёта. Если какой-то из них вырос
+    на ``growth`` байт или RSS впервые превысил ``rss_limit``, сторож
+    включает tracemalloc, снимает исходный снимок и через ``window``
+    секунд (с точностью до ``interval``) пишет в ``dump_dir`` отчёт:
+    самые крупные места выделения памяти и их прирост за это окно.
+    После отчёта tracemalloc выключается, если его включал сторож, так
+    что вне окон проверка стоит одного чтения RSS. С ``always_trace``
+    tracemalloc работает постоянно, а отчёт пишется сразу с приростом
+    с прошлого снимка. Хранится ``frames`` кадров стека.
+    """
+
+    def __init__(self, dump_dir: str, rss_limit: int, growth: int,
+                 interval: float = 60, window: float = 60, frames: int = 1,
+                 top: int = 20, always_trace: bool = False) -> None:
+        self.dump_dir = dump_dir
+        self.rss_limit = rss_limit
+        self.growth = growth
+        self.interval = interval
+        self.window = window
+        self.frames = frames
+        self.top = top
+        self.always_trace = always_trace
+        self.dumps = 0
+        self.rss = 0
+        self.traced = 0
+        self._over_limit = False
+        self._baseline = None
+        self._window_end = None
+        self._started_tracemalloc = False
+        self._stop = threading.Event()
+
+    def start(self) -> threading.Thread:
+        """Запуск фонового потока проверок."""
+        if self.always_trace:
+            self._start_tracing()
+        self._baseline = self._measure()
+        thread = threading.Thread(
+            target=self._run, name='memory-watchdog', daemon=True
+        )
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        """Остановка проверок и tracemalloc, если его запускал сторож."""
+        self._stop.set()
+        self._stop_tracing()
+
+    def _start_tracing(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracemalloc = True
+
+    def _stop_tracing(self) -> None:
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def _measure(self) -> tuple:
+        snapshot = None
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces([
+                tracemalloc.Filter(False, name) for name in IGNORED_FILES
+            ])
+        self.rss = current_rss()
+        self.traced = tracemalloc.get_traced_memory()[0]
+        return self.rss, self.traced, snapshot
+
+    def check(self):
+        """Одна проверка; путь к отчёту, если он был записан."""
+        if self._window_end is not None:
+            if time.monotonic() < self._window_end:
+                return None
+            return self._close_window()
+        rss = current_rss()
+        traced = tracemalloc.get_traced_memory()[0]
+        base_rss, base_traced, previous = self._baseline
+        over_limit = rss >= self.rss_limit and not self._over_limit
+        self._over_limit = rss >= self.rss_limit
+        if not (
+            over_limit
+            or rss - base_rss >= self.growth
+            or traced - base_traced >= self.growth
+        ):
+            self.rss, self.traced = rss, traced
+            return None
+        if previous is not None:
+            current = self._measure()
+            path = self._dump(previous, current)
+            self._baseline = current
+            return path
+        self._start_tracing()
+        self._baseline = self._measure()
+        self._window_end = time.monotonic() + self.window
+        logging.warning(
+            f'Рост памяти: RSS {rss / MB:.1f} МБ. tracemalloc включён '
+            f'на {self.window:.0f} с.'
+        )
+        return None
+
+    def _close_window(self) -> str:
+        current = self._measure()
+        path = self._dump(self._baseline[2], current)
+        self._window_end = None
+        self._stop_tracing()
+        self._baseline = self._measure()
+        return path
+
+    def _dump(self, previous, current: tuple) -> str:
+        rss, traced, snapshot = current
+        os.makedirs(self.dump_dir, exist_ok=True)
+        self.dumps += 1
+        path = os.path.join(self.dump_dir, '{}-{:03d}.txt'.format(
+            time.strftime('memory-%Y%m%d-%H%M%S'), self.dumps
+        ))
+        lines = [
+            f'RSS: {self._baseline[0] / MB:.1f} -> {rss / MB:.1f} МБ, '
+            f'tracemalloc: {traced / MB:.1f} МБ',
+            '',
+            'Крупнейшие места выделения памяти:',
+        ]
+        lines += map(str, snapshot.statistics('lineno')[:self.top])
+        lines += ['', 'Прирост с прошлого снимка:']
+        lines += map(str, snapshot.compare_to(previous, 'lineno')[:self.top])
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n')
+        logging.warning(
+            f'Рост памяти: RSS {rss / MB:.1f} МБ, '
+            f'tracemalloc {traced / MB:.1f} МБ. Отчёт: {path}'
+        )
+        return path
+
+    def stats(self) -> dict:
+        """Последние измерения памяти."""
+        return {
+            'rss_mb': round(self.rss / MB, 1),
+            'traced_mb': round(self.traced / MB, 1),
+            'tracing': self._window_end is not None,
+            'dumps': self.dumps,
+        }
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as error:
+                logging.error(f'Сбой проверки памяти:\n {error}')
@@ -0,0 +1,300 @@
+import logging
+import smtplib
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from email.message import EmailMessage
+
+import requests
+import telegram
+
+from pipeline import Notification, SheddingQueue, alert_key
+from tracing import parse_date
+
+LATENCY_WINDOW = 100
+
+
+class Notifier(ABC):
+    """Канал доставки уведомлений со своей очередью и потоком.
+
+    У каждого канала свой таймаут, бюджет повторов и метрики задержки.
+    Оповещения об ошибках при переполнении очереди канала сбрасываются,
+    а переходы статусов с ``block=True`` ждут места. После каждой
+    доставки вызывается
+    ``on_done(notification, delivered, permanent)``, если он задан;
+    ``permanent`` означает, что ошибка постоянная и повтор бесполезен.
+    Повторяются только временные ошибки (``is_transient``). Бюджет
+    повторов пополняется на ``retry_ratio`` за каждую доставку и не
+    даёт повторам множить нагрузку на лежащий сервис.
+    """
+
+    name = 'notifier'
+
+    def __init__(self, timeout: float = 10, retries: int = 2,
+                 retry_ratio: float = 0.2, backoff: float = 1,
+                 maxsize: int = 100, on_done=None) -> None:
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_ratio = retry_ratio
+        self.backoff = backoff
+        self.on_done = on_done
+        self.retry_budget = float(retries)
+        self.queue = SheddingQueue(maxsize, self.name, alert_key)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def send(self, notification: Notification) -> None:
+        """Одна попытка доставки; при ошибке выбрасывает исключение."""
+
+    def is_transient(self, error: Exception) -> bool:
+        """Имеет ли смысл повторить попытку после ошибки ``error``."""
+        return isinstance(error, (ConnectionError, TimeoutError))
+
+    def retry_delay(self, error: Exception, attempt: int) -> float:
+        """Пауза перед повтором после попытки номер ``attempt``."""
+        return self.backoff * (attempt + 1)
+
+    def start(self) -> None:
+        """Запуск потока доставки канала."""
+        threading.Thread(
+            target=self._run, name=f'notifier-{self.name}', daemon=True
+        ).start()
+
+    def submit(self, notification: Notification, block: bool = True) -> bool:
+        """Постановка в очередь канала; ``False``, если сброшено."""
+        return self.queue.put(notification, notification.priority, block)
+
+    def deliver(self, notification: Notification) -> bool:
+        """Доставка с повторами в пределах бюджета."""
+        return self._deliver(notification) is None
+
+    def _deliver(self, notification: Notification):
+        started = time.monotonic()
+        started_ns = time.time_ns()
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                self.send(notification)
+            except Exception as exc:
+                error = exc
+                logging.warning(
+                    f'Канал {self.name}, попытка {attempt + 1}:\n {error}'
+                )
+                if not self.is_transient(error) or not self._take_retry():
+                    break
+                time.sleep(self.retry_delay(error, attempt))
+            else:
+                error = None
+                break
+        self._record(started, ok=error is None)
+        self._trace(notification, started_ns, error, attempt + 1)
+        if error is not None:
+            logging.error(f'Канал {self.name} не доставил уведомление.')
+        return error
+
+    def _trace(self, notification: Notification, started_ns: int,
+               error: Exception, attempts: int) -> None:
+        trace = notification.trace
+        if not trace.sampled:
+            return
+        attributes = {'backend': self.name}
+        if notification.homework is not None:
+            attributes['homework'] = notification.homework['homework_name']
+            date_updated = notification.homework.get('date_updated')
+            if date_updated:
+                attributes['status_changed_at'] = parse_date(date_updated)
+        if notification.queued_at is not None:
+            trace.record(
+                'queue.send', notification.queued_at, started_ns,
+                **attributes,
+            )
+        trace.record(
+            'send_message', started_ns, time.time_ns(), error,
+            attempts=attempts, **attributes,
+        )
+
+    def _take_retry(self) -> bool:
+        with self._lock:
+            if self.retry_budget < 1:
+                return False
+            self.retry_budget -= 1
+            self.retried += 1
+            return True
+
+    def _record(self, started: float, ok: bool) -> None:
+        with self._lock:
+            self.latencies.append(time.monotonic() - started)
+            if ok:
+                self.sent += 1
+                self.retry_budget = min(
+                    self.retry_budget + self.retry_ratio, self.retries
+                )
+            else:
+                self.failed += 1
+
+    def stats(self) -> dict:
+        """Счётчики доставки и задержки за последние уведомления."""
+        with self._lock:
+            latencies = sorted(self.latencies)
+            stats = {
+                'sent': self.sent,
+                'failed': self.failed,
+                'retried': self.retried,
+            }
+        if latencies:
+            stats['latency_p50'] = round(latencies[len(latencies) // 2], 3)
+            stats['latency_max'] = round(latencies[-1], 3)
+        stats.update(self.queue.stats())
+        return stats
+
+    def _run(self) -> None:
+        while True:
+            notification = self.queue.get()
+            try:
+                error = self._deliver(notification)
+                if self.on_done is not None:
+                    self.on_done(
+                        notification, error is None,
+                        error is not None and not self.is_transient(error),
+                    )
+            except Exception as error:
+                logging.error(
+                    f'Сбой в канале {self.name}:\n {error}', exc_info=True
+                )
+
+
+class TelegramNotifier(Notifier):
+    """Сообщение в чат тенанта."""
+
+    name = 'telegram'
+
+    def __init__(self, bot: telegram.Bot, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.bot = bot
+
+    def send(self, notification: Notification) -> None:
+        """Отправка через ``telegram.Bot.send_message``."""
+        self.bot.send_message(
+            chat_id=notification.tenant,
+            text=notification.text,
+            timeout=self.timeout,
+        )
+
+    def is_transient(self, error: Exception) -> bool:
+        """Сетевые ошибки, таймауты и ``RetryAfter``, но не ``BadRequest``."""
+        if isinstance(error, telegram.error.BadRequest):
+            return False
+        return isinstance(
+            error, (telegram.error.NetworkError, telegram.error.RetryAfter)
+        )
+
+    def retry_delay(self, error: Exception, attempt: int) -> float:
+        """Для ``RetryAfter`` - пауза, которую просит Telegram."""
+        if isinstance(error, telegram.error.RetryAfter):
+            return error.retry_after
+        return super().retry_delay(error, attempt)
+
+
+class WebhookNotifier(Notifier):
+    """POST с JSON ``{"chat_id": ..., "text": ...}`` на адрес ``url``."""
+
+    name = 'webhook'
+
+    def __init__(self, url: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.url = url
+
+    def send(self, notification: Notification) -> None:
+        """Один запрос к вебхуку."""
+        response = requests.post(
+            self.url,
+            json={'chat_id': notification.tenant, 'text': notification.text},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+
+    def is_transient(self, error: Exception) -> bool:
+        """Сетевые ошибки, таймауты, ответы 5xx и 429."""
+        if isinstance(error, requests.HTTPError):
+            status = error.response.status_code
+            return status >= 500 or status == 429
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class EmailNotifier(Notifier):
+    """Письмо через SMTP-сервер на адрес ``recipient``."""
+
+    name = 'email'
+
+    def __init__(self, host: str, port: int, sender: str, recipient: str,
+                 **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+
+    def send(self, notification: Notification) -> None:
+        """Одно письмо через новое SMTP-соединение."""
+        message = EmailMessage()
+        message['From'] = self.sender
+        message['To'] = self.recipient
+        message['Subject'] = f'Статус домашней работы: {notification.tenant}'
+        message.set_content(notification.text)
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+    def is_transient(self, error: Exception) -> bool:
+        """Обрыв соединения, сетевые ошибки и временные коды 4xx."""
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        if isinstance(error, smtplib.SMTPServerDisconnected):
+            return True
+        return (
+            isinstance(error, OSError)
+            and not isinstance(error, smtplib.SMTPException)
+        )
+
+
+class FanOut:
+    """Параллельная доставка уведомления во все каналы.
+
+    Первый канал - основной: переходы статусов ждут места в его
+    очереди, так что он создаёт обратное давление на конвейер и ничего
+    не теряет. Остальные каналы медленного основного и друг друга не
+    задерживают: при переполнении их очереди уведомление для них
+    сбрасывается и учитывается в ``shed``.
+    """
+
+    def __init__(self, notifiers: list) -> None:
+        self.notifiers = notifiers
+
+    def start(self) -> None:
+        """Запуск потоков всех каналов."""
+        for notifier in self.notifiers:
+            notifier.start()
+
+    def send(self, notification: Notification) -> None:
+        """Передача уведомления каждому каналу без ожидания доставки.
+
+        Ждёт, только если очередь основного канала заполнена переходами
+        статусов.
+        """
+        primary = self.notifiers[0]
+        for notifier in self.notifiers:
+            if not notifier.submit(notification, notifier is primary):
+                logging.warning(
+                    f'Канал {notifier.name}: уведомление сброшено '
+                    'или схлопнуто с уже стоящим в очереди.'
+                )
+
+    def stats(self) -> dict:
+        """Метрики всех каналов."""
+        return {
+            notifier.name: notifier.stats() for notifier in self.notifiers
+        }
@@ -0,0 +1,248 @@
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+from tracing import NOOP_TRACE
+
+STATUS = 0
+ALERT = 1
+
+Notification = namedtuple(
+    'Notification', 'tenant text priority homework trace queued_at',
+    defaults=(NOOP_TRACE, None),
+)
+
+
+def alert_key(notification: Notification) -> tuple:
+    """Признак одинаковых оповещений для схлопывания."""
+    return notification.tenant, notification.text
+
+
+class SheddingQueue:
+    """Ограниченная очередь со сбросом нагрузки по приоритету.
+
+    Переходы статусов (``STATUS``) никогда не теряются: если очередь
+    заполнена, из неё вытесняется самое старое оповещение об ошибке,
+    а если оповещений нет, поставщик ждёт освобождения места. Оповещения
+    (``ALERT``) при переполнении отбрасываются, а повтор уже стоящего в
+    очереди оповещения схлопывается с ним.
+    """
+
+    def __init__(self, maxsize: int, name: str, key=None) -> None:
+        self.maxsize = maxsize
+        self.name = name
+        self.key = key or (lambda item: item)
+        self.items = deque()
+        self.shed = 0
+        self.collapsed = 0
+        self.blocked = 0
+        self._cond = threading.Condition()
+
+    def put(self, item, priority: int = STATUS, block: bool = True) -> bool:
+        """Постановка в очередь; ``False``, если элемент сброшен.
+
+        С ``block=False`` переход статуса при полной очереди без
+        оповещений тоже сбрасывается, а не ждёт.
+        """
+        with self._cond:
+            if priority == ALERT:
+                key = self.key(item)
+                if any(
+                    priority == ALERT and self.key(queued) == key
+                    for priority, queued in self.items
+                ):
+                    self.collapsed += 1
+                    return False
+                if len(self.items) >= self.maxsize:
+                    self.shed += 1
+                    return False
+            elif len(self.items) >= self.maxsize and not self._evict():
+                if not block:
+                    self.shed += 1
+                    return False
+                self.blocked += 1
+                logging.warning(f'Очередь {self.name} переполнена.')
+                self._cond.wait_for(lambda: len(self.items) < self.maxsize)
+            self.items.append((priority, item))
+            self._cond.notify_all()
+            return True
+
+    def _evict(self) -> bool:
+        for entry in self.items:
+            if entry[0] == ALERT:
+                self.items.remove(entry)
+                self.shed += 1
+                return True
+        return False
+
+    def get(self):
+        """Извлечение элемента с ожиданием."""
+        with self._cond:
+            self._cond.wait_for(lambda: self.items)
+            item = self.items.popleft()[1]
+            self._cond.notify_all()
+            return item
+
+    def stats(self) -> dict:
+        """Глубина очереди и счётчики сброса."""
+        with self._cond:
+            return {
+                'depth': len(self.items),
+                'maxsize': self.maxsize,
+                'shed': self.shed,
+                'collapsed': self.collapsed,
+                'blocked': self.blocked,
+            }
+
+
+class _Batch:
+    """Ответ API тенанта, ещё не доставленный целиком."""
+
+    def __init__(self, cursor) -> None:
+        self.cursor = cursor
+        self.pending = 0
+        self.failed = False
+
+
+class Pipeline:
+    """Стадии опрос -> подготовка -> отправка с ограниченными очередями.
+
+    Опрос ставит ответы API в очередь подготовки, поток подготовки
+    превращает их в уведомления, а потоки отправки доставляют их.
+    Уведомления одного тенанта всегда попадают к одному потоку
+    отправки, поэтому порядок переходов статусов сохраняется.
+
+    ``deliver`` возвращает ``False``, если не передал уведомление
+    каналам. Об итоге доставки каждого перехода статуса сообщает
+    ``done``; когда обработаны все переходы из ответа API, вызывается
+    ``commit(tenant, cursor)``. Если хоть один не доставлен из-за
+    временной ошибки, курсор не сдвигается и работы будут запрошены
+    повторно. Переход с постоянной ошибкой доставки (``permanent``)
+    повторять бесполезно, и он курсор не держит.
+    """
+
+    def __init__(self, render, deliver, workers: int = 1,
+                 maxsize: int = 100, commit=None) -> None:
+        self.render = render
+        self.deliver = deliver
+        self.commit = commit
+        self.fetched = SheddingQueue(maxsize, 'render')
+        self.outboxes = [
+            SheddingQueue(maxsize, f'send-{index}', alert_key)
+            for index in range(workers)
+        ]
+        self._batches = {}
+        self._cond = threading.Condition()
+
+    def start(self) -> None:
+        """Запуск потоков подготовки и отправки."""
+        stages = [(self.fetched, self._render)] + [
+            (outbox, self._send) for outbox in self.outboxes
+        ]
+        for queue, handler in stages:
+            threading.Thread(
+                target=self._run, args=(queue, handler),
+                name=f'pipeline-{queue.name}', daemon=True,
+            ).start()
+
+    def submit(self, tenant: str, homeworks: list, trace=NOOP_TRACE,
+               cursor=None) -> None:
+        """Передача ответа API на подготовку; ждёт при переполнении."""
+        with self._cond:
+            self._batches[tenant] = _Batch(cursor)
+        self.fetched.put((tenant, homeworks, trace, time.time_ns()))
+
+    def busy(self, tenant: str) -> bool:
+        """Есть ли у тенанта ещё не доставленный ответ API."""
+        with self._cond:
+            return tenant in self._batches
+
+    def drain(self, timeout: float) -> bool:
+        """Ожидание доставки всех принятых ответов API."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._batches, timeout)
+
+    def done(self, notification: Notification, delivered: bool,
+             permanent: bool = False) -> None:
+        """Итог доставки уведомления в основной канал."""
+        if notification.priority != STATUS:
+            return
+        with self._cond:
+            batch = self._batches.get(notification.tenant)
+            if batch is None:
+                return
+            batch.pending -= 1
+            batch.failed = batch.failed or not (delivered or permanent)
+            if batch.pending > 0:
+                return
+        self._finish(notification.tenant)
+
+    def notify(self, notification: Notification) -> bool:
+        """Постановка уведомления в очередь отправки тенанта."""
+        outbox = self.outboxes[hash(notification.tenant) % len(self.outboxes)]
+        return outbox.put(
+            notification._replace(queued_at=time.time_ns()),
+            notification.priority,
+        )
+
+    def alert(self, tenant: str, text: str) -> bool:
+        """Оповещение об ошибке с низким приоритетом."""
+        return self.notify(Notification(tenant, text, ALERT, None))
+
+    def stats(self) -> dict:
+        """Состояние всех очередей конвейера."""
+        return {
+            queue.name: queue.stats()
+            for queue in [self.fetched] + self.outboxes
+        }
+
+    def _finish(self, tenant: str, failed: bool = False) -> None:
+        with self._cond:
+            batch = self._batches.pop(tenant, None)
+            self._cond.notify_all()
+        if batch is None:
+            return
+        if failed or batch.failed:
+            logging.warning(
+                f'Не все статусы {tenant} доставлены, курсор не сдвинут.'
+            )
+        elif self.commit is not None and batch.cursor is not None:
+            self.commit(tenant, batch.cursor)
+
+    def _render(self, batch: tuple) -> None:
+        tenant, homeworks, trace, queued_at = batch
+        trace.record('queue.render', queued_at, time.time_ns())
+        try:
+            notifications = list(self.render(tenant, homeworks, trace))
+        except Exception:
+            self._finish(tenant, failed=True)
+            raise
+        statuses = sum(
+            notification.priority == STATUS for notification in notifications
+        )
+        with self._cond:
+            self._batches[tenant].pending = statuses
+        for notification in notifications:
+            self.notify(notification)
+        if not statuses:
+            self._finish(tenant)
+
+    def _send(self, notification: Notification) -> None:
+        try:
+            handed_off = self.deliver(notification)
+        except Exception:
+            self.done(notification, False)
+            raise
+        if not handed_off:
+            self.done(notification, False)
+
+    def _run(self, queue: SheddingQueue, handler) -> None:
+        while True:
+            item = queue.get()
+            try:
+                handler(item)
+            except Exception as error:
+                logging.error(
+                    f'Сбой в стадии {queue.name}:\n {error}', exc_info=True
+                )
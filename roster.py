@@ -0,0 +1,92 @@
+import json
+import logging
+import os
+from collections import namedtuple
+
+import exceptions
+from validators import schema_validator
+
+RosterDiff = namedtuple('RosterDiff', 'added removed changed')
+
+TENANT_SCHEMA = {
+    'practicum_token': (str, None),
+}
+validate_tenant = schema_validator(TENANT_SCHEMA, 'tenant')
+
+
+class Tenant(namedtuple('Tenant', 'chat_id practicum_token')):
+    """Студент: чат в телеграме и токен API Практикума."""
+
+    __slots__ = ()
+
+    @property
+    def headers(self) -> dict:
+        """Заголовки запроса к API от имени тенанта."""
+        return {'Authorization': f'OAuth {self.practicum_token}'}
+
+
+def load_roster(path: str) -> dict:
+    """Чтение ростера вида ``{chat_id: {"practicum_token": ...}}``."""
+    with open(path, encoding='utf-8') as file:
+        data = json.load(file)
+    if not isinstance(data, dict):
+        raise exceptions.RosterError('Ростер должен быть JSON-объектом.')
+    roster = {}
+    for chat_id, entry in data.items():
+        error = validate_tenant(entry)
+        if error is not None:
+            raise exceptions.RosterError(f'Тенант {chat_id}: {error}')
+        roster[chat_id] = Tenant(chat_id, entry['practicum_token'])
+    return roster
+
+
+def diff_roster(old: dict, new: dict) -> RosterDiff:
+    """Добавленные, удалённые и изменённые тенанты."""
+    return RosterDiff(
+        added=[new[key] for key in new.keys() - old.keys()],
+        removed=[old[key] for key in old.keys() - new.keys()],
+        changed=[
+            new[key] for key in new.keys() & old.keys()
+            if new[key] != old[key]
+        ],
+    )
+
+
+class RosterWatcher:
+    """Перечитывание ростера по SIGHUP или при изменении файла."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.roster = {}
+        self._mtime = None
+        self._requested = False
+
+    def request_reload(self) -> None:
+        """Принудительное перечитывание при следующей проверке."""
+        self._requested = True
+
+    def poll(self):
+        """Разница с прежним ростером или ``None``, если её нет."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as error:
+            logging.error(f'Ростер недоступен:\n {error}')
+            return None
+        if mtime == self._mtime and not self._requested:
+            return None
+        self._mtime = mtime
+        self._requested = False
+        try:
+            roster = load_roster(self.path)
+        except (OSError, ValueError, exceptions.RosterError) as error:
+            logging.error(f'Ростер не загружен, оставлен прежний:\n {error}')
+            return None
+        diff = diff_roster(self.roster, roster)
+        self.roster = roster
+        if not any(diff):
+            return None
+        logging.info(
+            f'Ростер обновлён: добавлено {len(diff.added)}, '
+            f'удалено {len(diff.removed)}, изменено {len(diff.changed)}.'
+        )
+        return diff
@@ -0,0 +1,66 @@
+import heapq
+import threading
+import time
+
+
+class Scheduler:
+    """Расписание опроса тенантов на куче сроков.
+
+    Разница ростера применяется точечно: новые тенанты ставятся в
+    очередь сразу, удалённые исчезают из расписания, а у изменённых
+    обновляются только настройки - срок следующего опроса сохраняется.
+    Записи удалённых тенантов остаются в куче и пропускаются по номеру
+    поколения.
+    """
+
+    def __init__(self) -> None:
+        self.tenants = {}
+        self._generations = {}
+        self._heap = []
+        self._wakeup = threading.Event()
+
+    def apply(self, diff) -> None:
+        """Применение разницы ростера к расписанию."""
+        for tenant in diff.removed:
+            self.tenants.pop(tenant.chat_id, None)
+        for tenant in diff.changed:
+            self.tenants[tenant.chat_id] = tenant
+        for tenant in diff.added:
+            self.tenants[tenant.chat_id] = tenant
+            self._generations[tenant.chat_id] = (
+                self._generations.get(tenant.chat_id, 0) + 1
+            )
+            self.schedule(tenant.chat_id, 0)
+        self.wakeup()
+
+    def schedule(self, chat_id: str, delay: float) -> None:
+        """Следующий опрос тенанта через ``delay`` секунд."""
+        if chat_id in self.tenants:
+            heapq.heappush(
+                self._heap,
+                (time.time() + delay, chat_id, self._generations[chat_id]),
+            )
+
+    def wakeup(self) -> None:
+        """Прерывание ожидания в ``next_due``."""
+        self._wakeup.set()
+
+    def next_due(self, timeout: float):
+        """Пара (тенант, срок), если его пора опросить, иначе ``None``."""
+        while self._heap:
+            due, chat_id, generation = self._heap[0]
+            if (
+                chat_id not in self.tenants
+                or self._generations[chat_id] != generation
+            ):
+                heapq.heappop(self._heap)
+                continue
+            delay = due - time.time()
+            if delay <= 0:
+                heapq.heappop(self._heap)
+                return self.tenants[chat_id], due
+            timeout = min(timeout, delay)
+            break
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        return None
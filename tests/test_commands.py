@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from commands import NO_DATA_TEXT, CommandListener
+from history import HistoryStore
+
+
+class MockBot:
+
+    def __init__(self):
+        self.sent = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class FailingLeases:
+
+    def __init__(self):
+        self.calls = 0
+
+    def acquire(self, tenant):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError('база аренд недоступна')
+        raise SystemExit
+
+
+def render(homework):
+    return f'{homework["homework_name"]} {homework["status"]}'
+
+
+class TestCommands:
+
+    def test_status_and_history(self, tmp_path):
+        store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+        bot = MockBot()
+        listener = CommandListener(bot, store, leases=None, render=render)
+
+        listener.dispatch('1', '/status')
+        assert bot.sent[-1] == ('1', NO_DATA_TEXT), (
+            'Без известных статусов бот должен сообщить, что данных нет'
+        )
+
+        for day, status in enumerate(('reviewing', 'rejected', 'approved')):
+            store.append('1', {
+                'homework_name': 'hw1', 'status': status,
+                'date_updated': f'2026-01-0{day + 1}T00:00:00Z',
+            })
+        store.append('1', {'homework_name': 'hw2', 'status': 'reviewing'})
+        store.append('2', {'homework_name': 'hw3', 'status': 'approved'})
+        listener.dispatch('1', '/status@homework_bot')
+        assert bot.sent[-1] == ('1', 'hw1 approved\nhw2 reviewing'), (
+            'Команда /status должна отвечать последним статусом работы'
+        )
+        listener.dispatch('1', '/history')
+        assert bot.sent[-1][1].startswith(
+            '2026-01-01T00:00:00Z: hw1 reviewing\n'
+        ), 'Команда /history должна отвечать журналом от старых к новым'
+
+    def test_other_replica_sees_statuses(self, tmp_path):
+        path = str(tmp_path / 'history.sqlite3')
+        HistoryStore(path).append(
+            '1', {'homework_name': 'hw1', 'status': 'approved'}
+        )
+        bot = MockBot()
+        CommandListener(
+            bot, HistoryStore(path), leases=None, render=render
+        ).dispatch('1', '/status')
+        assert bot.sent[-1] == ('1', 'hw1 approved'), (
+            'Ответ на /status не должен зависеть от реплики-владельца'
+        )
+
+    def test_unknown_command_ignored(self, tmp_path):
+        bot = MockBot()
+        listener = CommandListener(
+            bot, HistoryStore(str(tmp_path / 'h.sqlite3')), None, render
+        )
+        listener.dispatch('1', 'hi')
+        listener.dispatch('1', '   ')
+        assert not bot.sent
+
+    def test_listener_survives_errors(self, monkeypatch):
+        monkeypatch.setattr(time, 'sleep', lambda seconds: None)
+        leases = FailingLeases()
+        with pytest.raises(SystemExit):
+            CommandListener(MockBot(), None, leases, render).run()
+        assert leases.calls == 2, (
+            'Ошибка в цикле команд не должна останавливать слушателя'
+        )
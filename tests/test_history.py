@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+
+from history import HistoryStore, benchmark
+
+
+def homework(status, date):
+    return {
+        'homework_name': 'hw1',
+        'status': status,
+        'date_updated': f'2026-01-{date}T00:00:00Z',
+    }
+
+
+class TestHistory:
+
+    def test_only_transitions_are_stored(self, tmp_path):
+        store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+        assert store.append('1', homework('reviewing', '01'))
+        assert not store.append('1', homework('reviewing', '02')), (
+            'Повторный статус работы не должен попадать в журнал'
+        )
+        assert store.append('1', homework('approved', '03'))
+        assert [hw['status'] for hw in store.latest('1', 10)] == [
+            'reviewing', 'approved'
+        ]
+
+    def test_only_delivered_statuses_recorded(self, tmp_path):
+        import homework as bot
+        from pipeline import STATUS, Notification, Pipeline
+
+        store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+        pipeline = Pipeline(None, None)
+        notification = Notification(
+            '1', 'Статус', STATUS, homework('approved', '01')
+        )
+        bot.confirm_delivery(store, pipeline, notification, False)
+        assert store.latest('1', 10) == [], (
+            'Недоставленный статус не должен попадать в журнал'
+        )
+        bot.confirm_delivery(store, pipeline, notification, True)
+        assert len(store.latest('1', 10)) == 1
+
+    def test_history_error_does_not_block_tenant(self, tmp_path):
+        import homework as bot
+        from pipeline import STATUS, Notification, Pipeline
+
+        class LockedStore:
+            def append(self, tenant, homework):
+                raise sqlite3.OperationalError('database is locked')
+
+        notification = Notification(
+            '1', 'Статус', STATUS, homework('approved', '01')
+        )
+        handed_off = threading.Event()
+
+        def deliver(item):
+            handed_off.set()
+            return True
+
+        pipeline = Pipeline(lambda *args: [notification], deliver)
+        pipeline.start()
+        pipeline.submit('1', [notification.homework], cursor=100)
+        assert handed_off.wait(1)
+        bot.confirm_delivery(LockedStore(), pipeline, notification, True)
+        assert not pipeline.busy('1'), (
+            'Ошибка журнала не должна оставлять тенанта занятым навсегда'
+        )
+        assert pipeline.drain(0)
+
+    def test_reports(self, tmp_path):
+        store = HistoryStore(str(tmp_path / 'history.sqlite3'))
+        store.append('1', homework('reviewing', '05'))
+        store.append('1', homework('rejected', '06'))
+        store.append('1', homework('reviewing', '07'))
+        store.append('1', homework('approved', '09'))
+        store.append('2', homework('approved', '09'))
+
+        report = store.turnaround('month')
+        assert len(report) == 1 and report[0]['reviews'] == 2
+        day = 24 * 3600
+        assert day <= report[0]['p50'] <= day * 1.05, (
+            'Медиана времени ревью должна считаться с точностью до 5%'
+        )
+        assert 2 * day <= report[0]['p95'] <= 2 * day * 1.05
+
+        rejections = store.rejections('month')
+        assert rejections[0]['verdicts'] == 3
+        assert rejections[0]['rejected'] == 1
+        assert store.rejections('month', tenant='2')[0]['rate'] == 0
+
+    def test_benchmark_seeds_once(self, tmp_path, capsys):
+        path = str(tmp_path / 'history.sqlite3')
+        benchmark(path, rows=200, tenants=3)
+        benchmark(path, rows=200, tenants=3)
+        assert HistoryStore(path).size() == 200, (
+            'Повторный запуск не должен дописывать журнал'
+        )
+        assert 'turnaround week' in capsys.readouterr().out
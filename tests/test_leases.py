@@ -0,0 +1,88 @@
+import time
+
+from leases import LeaseManager
+
+
+class TestLeases:
+
+    def test_single_holder(self, tmp_path):
+        path = str(tmp_path / 'leases.sqlite3')
+        first = LeaseManager(path, 'replica-1', ttl=60)
+        second = LeaseManager(path, 'replica-2', ttl=60)
+        assert first.acquire('chat'), (
+            'Первая реплика должна получить свободную аренду'
+        )
+        assert not second.acquire('chat'), (
+            'Вторая реплика не должна получить занятую аренду'
+        )
+        assert first.acquire('chat'), (
+            'Владелец должен продлевать свою аренду'
+        )
+
+    def test_failover_keeps_cursor(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'leases.sqlite3')
+        first = LeaseManager(path, 'replica-1', ttl=60)
+        second = LeaseManager(path, 'replica-2', ttl=60)
+        first.acquire('chat')
+        assert first.set_cursor('chat', 12345)
+        assert not second.set_cursor('chat', 1), (
+            'Отметку времени может менять только владелец аренды'
+        )
+
+        now = time.time()
+        monkeypatch.setattr(time, 'time', lambda: now + 61)
+        assert second.acquire('chat'), (
+            'После истечения аренды её должна получить другая реплика'
+        )
+        assert second.get_cursor('chat') == 12345, (
+            'Новая реплика должна продолжить с сохранённой отметки времени'
+        )
+        assert not first.acquire('chat')
+
+    def test_release(self, tmp_path):
+        path = str(tmp_path / 'leases.sqlite3')
+        first = LeaseManager(path, 'replica-1', ttl=60)
+        second = LeaseManager(path, 'replica-2', ttl=60)
+        first.acquire('chat')
+        first.release_all()
+        assert second.acquire('chat'), (
+            'Освобождённую аренду должна сразу получить другая реплика'
+        )
+
+    def test_retired_tenant_not_reacquired(self, tmp_path):
+        path = str(tmp_path / 'leases.sqlite3')
+        first = LeaseManager(path, 'replica-1', ttl=60)
+        second = LeaseManager(path, 'replica-2', ttl=60)
+        first.acquire('chat')
+        first.retire('chat')
+        assert not first.acquire('chat'), (
+            'Тенанта, убранного из ростера, нельзя захватить снова'
+        )
+        assert 'chat' not in first.held, (
+            'Фоновое продление не должно видеть убранного тенанта'
+        )
+        assert second.acquire('chat')
+        first.restore('chat')
+        second.release('chat')
+        assert first.acquire('chat'), (
+            'Возвращённого в ростер тенанта можно захватить снова'
+        )
+
+    def test_stalled_replica_stops_renewing(self, tmp_path, monkeypatch):
+        path = str(tmp_path / 'leases.sqlite3')
+        first = LeaseManager(path, 'replica-1', ttl=60)
+        second = LeaseManager(path, 'replica-2', ttl=60)
+        first.acquire('chat')
+        now, started = time.time(), time.monotonic()
+        monkeypatch.setattr(time, 'monotonic', lambda: started + 50)
+        monkeypatch.setattr(time, 'time', lambda: now + 50)
+        first.touch()
+        assert first.renew()
+        monkeypatch.setattr(time, 'monotonic', lambda: started + 115)
+        monkeypatch.setattr(time, 'time', lambda: now + 115)
+        assert not first.renew(), (
+            'Зависшая реплика не должна продлевать аренды'
+        )
+        assert second.acquire('chat'), (
+            'Аренду зависшей реплики должна получить другая реплика'
+        )
@@ -0,0 +1,81 @@
+import os
+import tracemalloc
+
+from memory_watchdog import MemoryWatchdog
+
+
+def read(path):
+    with open(path, encoding='utf-8') as file:
+        return file.read()
+
+
+class TestMemoryWatchdog:
+
+    def test_dump_on_growth(self, tmp_path):
+        watchdog = MemoryWatchdog(
+            str(tmp_path), rss_limit=2 ** 62, growth=1024 * 1024,
+            interval=3600, always_trace=True,
+        )
+        watchdog.start()
+        try:
+            assert watchdog.check() is None, (
+                'Без роста памяти отчёт не должен записываться'
+            )
+            retained = [bytearray(1024) for _ in range(2048)]
+            path = watchdog.check()
+            assert path is not None, (
+                'При росте памяти должен записываться отчёт'
+            )
+            assert 'test_memory_watchdog.py' in read(path), (
+                'Отчёт должен указывать место выделения памяти'
+            )
+            assert watchdog.check() is None, (
+                'Повторный отчёт нужен только при новом росте'
+            )
+            assert watchdog.stats()['dumps'] == 1
+            del retained
+        finally:
+            watchdog.stop()
+
+    def test_bounded_tracing_window(self, tmp_path):
+        watchdog = MemoryWatchdog(
+            str(tmp_path), rss_limit=1, growth=2 ** 62, interval=3600,
+            window=0,
+        )
+        watchdog.start()
+        try:
+            assert not tracemalloc.is_tracing(), (
+                'До первого роста памяти tracemalloc не должен работать'
+            )
+            assert watchdog.check() is None
+            assert tracemalloc.is_tracing(), (
+                'При превышении лимита RSS должно начинаться окно трассировки'
+            )
+            retained = [bytearray(1024) for _ in range(512)]
+            path = watchdog.check()
+            assert 'test_memory_watchdog.py' in read(path), (
+                'Отчёт за окно должен указывать место выделения памяти'
+            )
+            assert not tracemalloc.is_tracing(), (
+                'После окна tracemalloc должен выключаться'
+            )
+            assert watchdog.check() is None, (
+                'Превышение лимита RSS должно сообщаться один раз'
+            )
+            del retained
+        finally:
+            watchdog.stop()
+
+    def test_dumps_in_same_second_kept(self, tmp_path):
+        watchdog = MemoryWatchdog(
+            str(tmp_path), rss_limit=2 ** 62, growth=0, interval=3600,
+            always_trace=True,
+        )
+        watchdog.start()
+        try:
+            paths = {watchdog.check() for _ in range(3)}
+        finally:
+            watchdog.stop()
+        assert len(paths) == 3 and len(os.listdir(tmp_path)) == 3, (
+            'Отчёты, записанные в одну секунду, не должны затирать друг друга'
+        )
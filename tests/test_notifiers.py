@@ -0,0 +1,239 @@
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from notifiers import EmailNotifier, FanOut, Notifier, WebhookNotifier
+from pipeline import STATUS, Notification
+
+NOTIFICATION = Notification('42', 'Статус изменился', STATUS, None)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    received = []
+    status = 200
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        self.received.append(json.loads(self.rfile.read(length)))
+        self.send_response(self.status)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    received = []
+
+    def reply(self, line):
+        self.wfile.write(line.encode() + b'\r\n')
+
+    def handle(self):
+        self.reply('220 localhost')
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line.split(' ')[0].upper()
+            if command == 'DATA':
+                self.reply('354 go ahead')
+                lines = []
+                while (line := self.rfile.readline()) != b'.\r\n':
+                    lines.append(line)
+                self.received.append(b''.join(lines).decode())
+                self.reply('250 ok')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                return
+            elif command in ('EHLO', 'HELO', 'MAIL', 'RCPT', 'RSET', 'NOOP'):
+                self.reply('250 ok')
+            else:
+                return
+
+
+def serve(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+class FailingNotifier(Notifier):
+    name = 'failing'
+
+    def __init__(self, error=ConnectionError('недоступен'), **kwargs):
+        super().__init__(**kwargs)
+        self.error = error
+        self.attempts = 0
+
+    def send(self, notification):
+        self.attempts += 1
+        raise self.error
+
+
+class SlowNotifier(Notifier):
+    name = 'slow'
+
+    def send(self, notification):
+        time.sleep(1)
+
+
+class CountingNotifier(Notifier):
+    name = 'counting'
+
+    def __init__(self, delay, **kwargs):
+        super().__init__(**kwargs)
+        self.delay = delay
+        self.delivered = []
+
+    def send(self, notification):
+        time.sleep(self.delay)
+        self.delivered.append(notification.text)
+
+
+class TestNotifiers:
+
+    def test_webhook(self):
+        server = HTTPServer(('127.0.0.1', 0), WebhookHandler)
+        port = serve(server)
+        notifier = WebhookNotifier(f'http://127.0.0.1:{port}/hook')
+        assert notifier.deliver(NOTIFICATION)
+        server.shutdown()
+        assert WebhookHandler.received[-1] == {
+            'chat_id': '42', 'text': 'Статус изменился'
+        }
+        assert notifier.stats()['sent'] == 1
+
+    def test_email(self):
+        server = socketserver.ThreadingTCPServer(
+            ('127.0.0.1', 0), SMTPHandler
+        )
+        port = serve(server)
+        notifier = EmailNotifier(
+            '127.0.0.1', port, 'bot@localhost', 'student@localhost'
+        )
+        assert notifier.deliver(NOTIFICATION)
+        server.shutdown()
+        assert 'To: student@localhost' in SMTPHandler.received[-1]
+
+    def test_retry_budget(self):
+        notifier = FailingNotifier(retries=2, backoff=0)
+        assert not notifier.deliver(NOTIFICATION)
+        assert notifier.attempts == 3
+        assert not notifier.deliver(NOTIFICATION)
+        assert notifier.attempts == 4, (
+            'Исчерпанный бюджет повторов не должен давать новых попыток'
+        )
+        assert notifier.stats()['failed'] == 2
+
+    def test_permanent_errors_not_retried(self):
+        notifier = FailingNotifier(ValueError('плохой запрос'), backoff=0)
+        assert not notifier.deliver(NOTIFICATION)
+        assert notifier.attempts == 1, (
+            'Постоянные ошибки не должны повторяться'
+        )
+
+    def test_permanent_error_reported(self):
+        outcomes = []
+        notifier = FailingNotifier(
+            ValueError('плохой запрос'), backoff=0,
+            on_done=lambda *outcome: outcomes.append(outcome[1:]),
+        )
+        notifier.start()
+        notifier.submit(NOTIFICATION)
+        transient = FailingNotifier(
+            retries=0, on_done=lambda *outcome: outcomes.append(outcome[1:])
+        )
+        transient.start()
+        transient.submit(NOTIFICATION)
+        deadline = time.monotonic() + 1
+        while len(outcomes) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert sorted(outcomes) == [(False, False), (False, True)], (
+            'Каналу нужно сообщать, постоянная ли ошибка доставки'
+        )
+
+    def test_webhook_client_error_not_retried(self):
+        WebhookHandler.status = 400
+        server = HTTPServer(('127.0.0.1', 0), WebhookHandler)
+        port = serve(server)
+        notifier = WebhookNotifier(f'http://127.0.0.1:{port}/hook', backoff=0)
+        try:
+            assert not notifier.deliver(NOTIFICATION)
+        finally:
+            WebhookHandler.status = 200
+            server.shutdown()
+        assert notifier.stats()['retried'] == 0, (
+            'Ответ 4xx не должен повторяться'
+        )
+
+    def test_slow_backend_does_not_delay_others(self):
+        server = HTTPServer(('127.0.0.1', 0), WebhookHandler)
+        port = serve(server)
+        fast = WebhookNotifier(f'http://127.0.0.1:{port}/hook')
+        fanout = FanOut([fast, SlowNotifier()])
+        fanout.start()
+        started = time.monotonic()
+        fanout.send(NOTIFICATION)
+        while not fast.stats()['sent']:
+            time.sleep(0.01)
+        elapsed = time.monotonic() - started
+        server.shutdown()
+        assert elapsed < 0.5, (
+            'Медленный канал не должен задерживать доставку в остальные'
+        )
+
+    def test_slow_backend_loses_no_status(self):
+        done = []
+        slow = CountingNotifier(
+            0.05, maxsize=2, on_done=lambda item, ok, permanent: done.append(ok)
+        )
+        fanout = FanOut([slow])
+        fanout.start()
+        texts = [f'Статус {index}' for index in range(6)]
+        for text in texts:
+            fanout.send(NOTIFICATION._replace(text=text))
+        deadline = time.monotonic() + 5
+        while len(done) < len(texts) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert slow.delivered == texts, (
+            'Переходы статусов не должны теряться при медленном канале'
+        )
+        assert done == [True] * len(texts)
+        stats = slow.stats()
+        assert stats['shed'] == 0
+        assert stats['blocked'] > 0, (
+            'Переполненная очередь канала должна создавать обратное давление'
+        )
+
+    def test_full_secondary_does_not_block_primary(self):
+        fast = CountingNotifier(0)
+        slow = CountingNotifier(1, maxsize=1)
+        fanout = FanOut([fast, slow])
+        fanout.start()
+        started = time.monotonic()
+        for index in range(4):
+            fanout.send(NOTIFICATION._replace(text=f'Статус {index}'))
+        while len(fast.delivered) < 4 and time.monotonic() - started < 5:
+            time.sleep(0.01)
+        elapsed = time.monotonic() - started
+        assert len(fast.delivered) == 4 and elapsed < 0.5, (
+            'Заполненная очередь второстепенного канала не должна '
+            'задерживать основной'
+        )
+        assert slow.stats()['shed'] >= 2, (
+            'Сброшенные уведомления должны учитываться в метриках канала'
+        )
+
+    def test_send_message_uses_telegram_backend(self, monkeypatch):
+        import homework
+
+        class Bot:
+            sent = []
+
+            def send_message(self, chat_id=None, text=None, timeout=None):
+                self.sent.append((chat_id, text, timeout))
+
+        monkeypatch.setattr(homework, 'TELEGRAM_CHAT_ID', 42)
+        assert homework.send_message(Bot(), 'Проверка')
+        assert Bot.sent == [('42', 'Проверка', homework.NOTIFY_TIMEOUT)], (
+            'send_message должна отправлять через канал телеграма'
+        )
@@ -0,0 +1,153 @@
+import threading
+
+from pipeline import ALERT, STATUS, Notification, Pipeline, SheddingQueue
+
+
+def status(text):
+    return Notification('1', text, STATUS, {'homework_name': text})
+
+
+def alert(text):
+    return Notification('1', text, ALERT, None)
+
+
+class TestPipeline:
+
+    def test_alerts_are_shed_and_collapsed(self):
+        queue = SheddingQueue(2, 'test')
+        assert queue.put(alert('error'), ALERT)
+        assert not queue.put(alert('error'), ALERT), (
+            'Повторное оповещение должно схлопываться с уже стоящим в очереди'
+        )
+        assert queue.put(status('hw1'))
+        assert not queue.put(alert('other'), ALERT), (
+            'При переполнении оповещения должны отбрасываться'
+        )
+        assert queue.put(status('hw2')), (
+            'Переход статуса должен вытеснять оповещение из полной очереди'
+        )
+        assert [queue.get().text for _ in range(2)] == ['hw1', 'hw2']
+        stats = queue.stats()
+        assert (stats['shed'], stats['collapsed']) == (2, 1)
+
+    def test_status_waits_for_space(self):
+        queue = SheddingQueue(1, 'test')
+        queue.put(status('hw1'))
+        thread = threading.Thread(target=queue.put, args=(status('hw2'),))
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive(), (
+            'Переход статуса не должен теряться при переполнении очереди'
+        )
+        assert queue.get().text == 'hw1'
+        thread.join(1)
+        assert queue.get().text == 'hw2'
+        assert queue.stats()['blocked'] == 1
+
+    def test_stages(self):
+        delivered = []
+        done = threading.Event()
+
+        def render(tenant, homeworks, trace):
+            return [status(hw) for hw in homeworks]
+
+        def deliver(notification):
+            delivered.append(notification.text)
+            if len(delivered) == 3:
+                done.set()
+            return True
+
+        pipeline = Pipeline(render, deliver, workers=2, maxsize=2)
+        pipeline.start()
+        pipeline.submit('1', ['hw1', 'hw2', 'hw3'])
+        assert done.wait(1)
+        assert delivered == ['hw1', 'hw2', 'hw3'], (
+            'Уведомления одного тенанта должны отправляться по порядку'
+        )
+        assert set(pipeline.stats()) == {'render', 'send-0', 'send-1'}
+
+    def test_cursor_moves_after_delivery(self):
+        commits = []
+        handed_off = []
+        sent = threading.Event()
+
+        def render(tenant, homeworks, trace):
+            return [status(hw) for hw in homeworks] + [alert('error')]
+
+        def deliver(notification):
+            handed_off.append(notification)
+            if len(handed_off) == 3:
+                sent.set()
+            return True
+
+        pipeline = Pipeline(
+            render, deliver, commit=lambda *args: commits.append(args)
+        )
+        pipeline.start()
+        pipeline.submit('1', ['hw1', 'hw2'], cursor=100)
+        assert sent.wait(1)
+        assert pipeline.busy('1') and not commits, (
+            'Курсор не должен сдвигаться до подтверждения доставки'
+        )
+        for notification in handed_off:
+            pipeline.done(notification, True)
+        assert commits == [('1', 100)] and not pipeline.busy('1')
+
+        sent.clear()
+        handed_off.clear()
+        pipeline.submit('1', ['hw3', 'hw4'], cursor=200)
+        assert sent.wait(1)
+        pipeline.done(handed_off[0], False)
+        pipeline.done(handed_off[1], True)
+        assert commits == [('1', 100)], (
+            'Курсор не должен сдвигаться, если статус не доставлен'
+        )
+        assert not pipeline.busy('1')
+
+    def test_permanent_failure_moves_cursor(self):
+        commits = []
+        sent = threading.Event()
+        handed_off = []
+
+        def deliver(notification):
+            handed_off.append(notification)
+            if len(handed_off) == 2:
+                sent.set()
+            return True
+
+        pipeline = Pipeline(
+            lambda tenant, homeworks, trace: [status(hw) for hw in homeworks],
+            deliver, commit=lambda *args: commits.append(args),
+        )
+        pipeline.start()
+        pipeline.submit('1', ['hw1', 'hw2'], cursor=100)
+        assert sent.wait(1)
+        pipeline.done(handed_off[0], False, permanent=True)
+        pipeline.done(handed_off[1], True)
+        assert commits == [('1', 100)], (
+            'Постоянная ошибка доставки не должна держать курсор'
+        )
+
+    def test_empty_answer_moves_cursor(self):
+        commits = threading.Event()
+        pipeline = Pipeline(
+            lambda *args: [], None, commit=lambda *args: commits.set()
+        )
+        pipeline.start()
+        pipeline.submit('1', [], cursor=100)
+        assert commits.wait(1)
+
+    def test_drain_waits_for_delivery(self):
+        pipeline = Pipeline(
+            lambda tenant, homeworks, trace: [status(hw) for hw in homeworks],
+            lambda notification: True,
+        )
+        pipeline.start()
+        pipeline.submit('1', ['hw1'], cursor=100)
+        assert not pipeline.drain(0.1), (
+            'Остановка не должна завершаться до доставки статусов'
+        )
+        threading.Timer(
+            0.1, pipeline.done, (status('hw1'), True)
+        ).start()
+        assert pipeline.drain(1)
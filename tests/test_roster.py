@@ -0,0 +1,66 @@
+import json
+import os
+
+from roster import RosterWatcher, Tenant, diff_roster
+from scheduler import Scheduler
+
+
+def write_roster(path, tenants):
+    with open(path, 'w') as file:
+        json.dump(
+            {chat_id: {'practicum_token': token}
+             for chat_id, token in tenants.items()},
+            file,
+        )
+
+
+class TestRoster:
+
+    def test_diff(self):
+        old = {'1': Tenant('1', 'a'), '2': Tenant('2', 'b')}
+        new = {'1': Tenant('1', 'a2'), '3': Tenant('3', 'c')}
+        diff = diff_roster(old, new)
+        assert diff.added == [Tenant('3', 'c')]
+        assert diff.removed == [Tenant('2', 'b')]
+        assert diff.changed == [Tenant('1', 'a2')]
+        assert not any(diff_roster(new, new))
+
+    def test_watcher_keeps_roster_on_error(self, tmp_path):
+        path = str(tmp_path / 'roster.json')
+        write_roster(path, {'1': 'a'})
+        watcher = RosterWatcher(path)
+        assert watcher.poll().added == [Tenant('1', 'a')]
+        assert watcher.poll() is None, (
+            'Без изменений файла ростер не должен перечитываться'
+        )
+        with open(path, 'w') as file:
+            file.write('{"1": {}}')
+        os.utime(path, ns=(1, 1))
+        assert watcher.poll() is None
+        assert watcher.roster == {'1': Tenant('1', 'a')}, (
+            'Некорректный ростер не должен заменять прежний'
+        )
+        write_roster(path, {'1': 'a', '2': 'b'})
+        watcher.request_reload()
+        assert watcher.poll().added == [Tenant('2', 'b')]
+
+    def test_scheduler_applies_only_diff(self):
+        scheduler = Scheduler()
+        scheduler.apply(diff_roster({}, {'1': Tenant('1', 'a')}))
+        assert scheduler.next_due(0)[0] == Tenant('1', 'a')
+        scheduler.schedule('1', 100)
+        scheduler.apply(diff_roster(
+            {'1': Tenant('1', 'a')},
+            {'1': Tenant('1', 'a2'), '2': Tenant('2', 'b')},
+        ))
+        assert scheduler.next_due(0)[0] == Tenant('2', 'b'), (
+            'Изменённый тенант не должен опрашиваться заново'
+        )
+        assert scheduler.next_due(0) is None
+        assert scheduler.tenants['1'] == Tenant('1', 'a2')
+
+        scheduler.schedule('2', 0)
+        scheduler.apply(diff_roster({'2': Tenant('2', 'b')}, {}))
+        assert scheduler.next_due(0) is None, (
+            'Удалённый тенант не должен опрашиваться'
+        )
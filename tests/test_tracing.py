@@ -0,0 +1,42 @@
+import time
+
+from tracing import NOOP_TRACE, Tracer, load_spans, slowest_paths
+
+
+class TestTracing:
+
+    def test_sampling(self, tmp_path):
+        tracer = Tracer(str(tmp_path / 'traces.jsonl'), sample_rate=0)
+        assert tracer.start_trace('poll_cycle') is NOOP_TRACE, (
+            'Трасса вне выборки не должна ничего записывать'
+        )
+        assert Tracer(None).start_trace('poll_cycle') is NOOP_TRACE
+
+    def test_slowest_paths(self, tmp_path):
+        path = str(tmp_path / 'traces.jsonl')
+        tracer = Tracer(path, sample_rate=1)
+        now = time.time_ns()
+        for homework, changed in (('fast', now - 10**9), ('slow', 0)):
+            trace = tracer.start_trace('poll_cycle', now, tenant='1')
+            with trace.span('get_api_answer'):
+                pass
+            trace.record(
+                'send_message', now, now, backend='telegram',
+                homework=homework, status_changed_at=changed // 10**9,
+            )
+            trace.finish()
+
+        spans = load_spans(path)
+        assert {span['name'] for span in spans} == {
+            'poll_cycle', 'get_api_answer', 'send_message'
+        }
+        root = next(span for span in spans if span['name'] == 'poll_cycle')
+        assert all(
+            span.get('parentSpanId') == root['spanId']
+            for span in spans
+            if span['traceId'] == root['traceId'] and span is not root
+        ), 'Спаны цикла должны быть потомками корневого спана'
+
+        paths = slowest_paths(spans, limit=1)
+        assert [path['homework'] for path in paths] == ['slow']
+        assert 'get_api_answer' in paths[0]['stages']
@@ -0,0 +1,41 @@
+from validators import schema_validator
+
+SCHEMA = {
+    'homework_name': (str, None),
+    'status': (str, ('approved', 'rejected')),
+}
+
+
+class TestValidators:
+
+    def test_single_item(self):
+        validate = schema_validator(SCHEMA, 'homework')
+        assert validate({'homework_name': 'hw', 'status': 'approved'}) is None
+        assert 'homework_name' in validate({'status': 'approved'})
+        assert 'status' in validate({'homework_name': 'hw', 'status': 1})
+        assert "'unknown'" in validate(
+            {'homework_name': 'hw', 'status': 'unknown'}
+        )
+        assert validate(['hw']) is not None
+
+    def test_keys_with_quotes(self):
+        validate = schema_validator({'a"b\\c': (str, None)}, 'item "x"')
+        assert validate({'a"b\\c': 'ok'}) is None
+        assert 'a"b\\c' in validate({}), (
+            'Кавычки и обратная косая черта в ключах схемы допустимы'
+        )
+
+    def test_every_bad_item_reported(self):
+        import homework
+
+        items = [
+            {'homework_name': 'hw1', 'status': 'approved'},
+            {'homework_name': 'hw2'},
+            None,
+            {'homework_name': 'hw3', 'status': 'rejected'},
+        ]
+        valid, errors = homework.check_homeworks(items)
+        assert valid == [items[0], items[3]], (
+            'Некорректные работы не должны прерывать обработку остальных'
+        )
+        assert [index for index, _ in errors] == [1, 2]
@@ -0,0 +1,272 @@
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import time
+from calendar import timegm
+from collections import defaultdict
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+SERVICE_NAME = 'homework_bot'
+TRACE_FILE = os.getenv('TRACE_FILE', 'homework_bot.traces.jsonl')
+STATUS_OK = 1
+STATUS_ERROR = 2
+PATH = (
+    'detection',
+    'schedule_delay',
+    'get_api_answer',
+    'check_response',
+    'queue.render',
+    'parse_status',
+    'queue.send',
+    'send_message',
+)
+
+
+def parse_date(value) -> int:
+    """Перевод ``date_updated`` из ответа API в unix-время."""
+    try:
+        return timegm(time.strptime(value, '%Y-%m-%dT%H:%M:%SZ'))
+    except (TypeError, ValueError):
+        return int(time.time())
+
+
+def _attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {'boolValue': value}
+    elif isinstance(value, int):
+        typed = {'intValue': str(value)}
+    elif isinstance(value, float):
+        typed = {'doubleValue': value}
+    else:
+        typed = {'stringValue': str(value)}
+    return {'key': key, 'value': typed}
+
+
+def _value(attribute: dict):
+    typed = attribute['value']
+    if 'intValue' in typed:
+        return int(typed['intValue'])
+    return next(iter(typed.values()))
+
+
+class Trace:
+    """Трасса одного цикла опроса тенанта.
+
+    Корневой спан начинается в момент, когда тенанта было пора опросить,
+    остальные спаны - его прямые потомки и могут завершаться в других
+    потоках уже после корневого. Каждый спан записывается сразу.
+    """
+
+    sampled = True
+
+    def __init__(self, tracer: 'Tracer', name: str, start_ns: int,
+                 attributes: dict) -> None:
+        self.tracer = tracer
+        self.trace_id = os.urandom(16).hex()
+        self.root_id = os.urandom(8).hex()
+        self.name = name
+        self.start_ns = start_ns
+        self.attributes = attributes
+
+    def record(self, name: str, start_ns: int, end_ns: int,
+               error: Exception = None, **attributes) -> None:
+        """Запись завершённого спана."""
+        self.tracer.export(
+            self, os.urandom(8).hex(), self.root_id, name,
+            start_ns, end_ns, error, {**self.attributes, **attributes},
+        )
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Спан на время выполнения блока; исключение отмечает ошибку."""
+        start_ns = time.time_ns()
+        error = None
+        try:
+            yield
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self.record(name, start_ns, time.time_ns(), error, **attributes)
+
+    def finish(self, error: Exception = None) -> None:
+        """Запись корневого спана цикла."""
+        self.tracer.export(
+            self, self.root_id, None, self.name,
+            self.start_ns, time.time_ns(), error, self.attributes,
+        )
+
+
+class _NoopTrace:
+    """Трасса, не прошедшая выборку: ничего не записывает."""
+
+    sampled = False
+
+    def record(self, *args, **kwargs) -> None:
+        pass
+
+    @contextmanager
+    def span(self, *args, **kwargs):
+        yield
+
+    def finish(self, *args, **kwargs) -> None:
+        pass
+
+
+NOOP_TRACE = _NoopTrace()
+
+
+class Tracer:
+    """Спаны в формате OTLP/JSON в ротируемом локальном файле.
+
+    Решение о записи трассы принимается один раз при её начале с
+    вероятностью ``sample_rate``; у невыбранных трасс все спаны -
+    пустые операции. Каждая строка файла - отдельный объект
+    ``resourceSpans`` с одним спаном.
+    """
+
+    def __init__(self, path: str = None, sample_rate: float = 1.0,
+                 max_bytes: int = 10 * 1024 * 1024,
+                 backups: int = 3) -> None:
+        self.sample_rate = sample_rate
+        self._logger = None
+        if path:
+            self._logger = logging.getLogger(f'{__name__}.{path}')
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(
+                path, maxBytes=max_bytes, backupCount=backups,
+                encoding='utf-8',
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            self._logger.addHandler(handler)
+
+    def start_trace(self, name: str, start_ns: int = None, **attributes):
+        """Новая трасса или ``NOOP_TRACE``, если она не попала в выборку."""
+        if self._logger is None or random.random() >= self.sample_rate:
+            return NOOP_TRACE
+        return Trace(self, name, start_ns or time.time_ns(), attributes)
+
+    def export(self, trace: Trace, span_id: str, parent_id: str, name: str,
+               start_ns: int, end_ns: int, error: Exception,
+               attributes: dict) -> None:
+        """Запись одного спана строкой JSON."""
+        span = {
+            'traceId': trace.trace_id,
+            'spanId': span_id,
+            'name': name,
+            'kind': 1,
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(end_ns),
+            'attributes': [
+                _attribute(key, value) for key, value in attributes.items()
+            ],
+            'status': (
+                {'code': STATUS_ERROR, 'message': str(error)}
+                if error else {'code': STATUS_OK}
+            ),
+        }
+        if parent_id:
+            span['parentSpanId'] = parent_id
+        self._logger.info(json.dumps({'resourceSpans': [{
+            'resource': {'attributes': [
+                _attribute('service.name', SERVICE_NAME)
+            ]},
+            'scopeSpans': [{'scope': {'name': __name__}, 'spans': [span]}],
+        }]}, ensure_ascii=False))
+
+
+def load_spans(path: str) -> list:
+    """Спаны из файла трасс и его ротированных копий."""
+    spans = []
+    for name in sorted(glob.glob(glob.escape(path) + '*')):
+        with open(name, encoding='utf-8') as file:
+            for line in file:
+                for resource in json.loads(line)['resourceSpans']:
+                    for scope in resource['scopeSpans']:
+                        for span in scope['spans']:
+                            span['attributes'] = {
+                                item['key']: _value(item)
+                                for item in span['attributes']
+                            }
+                            spans.append(span)
+    return spans
+
+
+def _seconds(span: dict, field: str) -> float:
+    return int(span[field]) / 1e9
+
+
+def _same_path(span: dict, send: dict) -> bool:
+    return all(
+        span['attributes'].get(key, send['attributes'].get(key))
+        == send['attributes'].get(key)
+        for key in ('backend', 'homework')
+    )
+
+
+def slowest_paths(spans: list, limit: int = 10) -> list:
+    """Самые долгие пути от изменения статуса до доставки.
+
+    ``detection`` - время от изменения статуса на сервере до начала
+    цикла опроса, который его обнаружил.
+    """
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span['traceId']].append(span)
+    paths = []
+    for trace_spans in traces.values():
+        for send in trace_spans:
+            changed = send['attributes'].get('status_changed_at')
+            if send['name'] != 'send_message' or changed is None:
+                continue
+            stages = {
+                span['name']: (
+                    _seconds(span, 'endTimeUnixNano')
+                    - _seconds(span, 'startTimeUnixNano')
+                )
+                for span in trace_spans
+                if span['name'] in PATH[1:] and _same_path(span, send)
+            }
+            for span in trace_spans:
+                if 'parentSpanId' not in span:
+                    stages['detection'] = (
+                        _seconds(span, 'startTimeUnixNano') - changed
+                    )
+            paths.append({
+                'total': _seconds(send, 'endTimeUnixNano') - changed,
+                'tenant': send['attributes'].get('tenant'),
+                'homework': send['attributes'].get('homework'),
+                'backend': send['attributes'].get('backend'),
+                'failed': send['status']['code'] == STATUS_ERROR,
+                'stages': stages,
+            })
+    paths.sort(key=lambda path: path['total'], reverse=True)
+    return paths[:limit]
+
+
+def main(argv: list = None) -> None:
+    """Отчёт о самых медленных доставках по файлу трасс."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--file', default=TRACE_FILE)
+    parser.add_argument('-n', '--limit', type=int, default=10)
+    args = parser.parse_args(argv)
+    for path in slowest_paths(load_spans(args.file), args.limit):
+        stages = ', '.join(
+            f'{name} {path["stages"][name]:.3f}с'
+            for name in PATH if name in path['stages']
+        )
+        failed = ' (не доставлено)' if path['failed'] else ''
+        print(
+            f'{path["total"]:.1f}с\t{path["tenant"]}\t{path["homework"]}\t'
+            f'{path["backend"]}{failed}\n\t{stages}'
+        )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import logging
+import timeit
+
+_MISSING = object()
+
+
+def schema_validator(schema: dict, name: str = 'item'):
+    """Функция проверки элемента по схеме.
+
+    Схема задаёт для каждого обязательного ключа пару ``(тип, варианты)``,
+    где варианты - допустимые значения или ``None``. Функция возвращает
+    ``None`` для корректного элемента или текст первой найденной ошибки.
+    Тип сверяется точно (``type(value) is``), как он приходит из JSON.
+    """
+    rules = tuple(
+        (key, value_type, None if choices is None else frozenset(choices))
+        for key, (value_type, choices) in schema.items()
+    )
+
+    def validate(item):
+        if type(item) is not dict:
+            return f'{name} не является словарём'
+        for key, value_type, choices in rules:
+            value = item.get(key, _MISSING)
+            if value is _MISSING:
+                return f'Отсутствует ключ `{key}` в {name}'
+            if type(value) is not value_type:
+                return (
+                    f'Ключ `{key}` в {name} имеет тип {type(value).__name__}'
+                )
+            if choices is not None and value not in choices:
+                return f'Недокументированное значение `{key}`: {value!r}'
+        return None
+
+    return validate
+
+
+def _ad_hoc(items: list, statuses: dict) -> list:
+    valid = []
+    for item in items:
+        try:
+            item['homework_name']
+            if item['status'] not in statuses:
+                continue
+        except (KeyError, TypeError):
+            continue
+        valid.append(item)
+    return valid
+
+
+def benchmark(size: int = 10000, number: int = 20) -> None:
+    """Сравнение с прежними проверками на ``size`` элементах.
+
+    ``ad-hoc`` - прежние обращения ``homework['...']`` без проверки
+    типов и текста ошибок, ``schema`` - ``check_homeworks`` с проверкой
+    по схеме. Схема медленнее: за каждую работу она сверяет типы и
+    умеет объяснить, что не так, но и 10 тысяч работ проверяются за
+    единицы миллисекунд при опросе раз в десять минут.
+    """
+    import homework
+
+    items = [
+        {'homework_name': f'hw{index}', 'status': 'approved'}
+        for index in range(size)
+    ]
+    items[size // 2] = {'homework_name': 'broken'}
+    variants = {
+        'ad-hoc': lambda: _ad_hoc(items, homework.HOMEWORK_STATUSES),
+        'schema': lambda: homework.check_homeworks(items)[0],
+    }
+    logging.disable(logging.ERROR)
+    results = [func() for func in variants.values()]
+    assert all(result == results[0] for result in results)
+    for label, func in variants.items():
+        seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+        print(f'{label}:\t{seconds * 1000:.2f} мс на {size} элементов')
+
+
+if __name__ == '__main__':
+    benchmark()